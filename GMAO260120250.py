@@ -1,9 +1,31 @@
 import os
+import sys
 import json
-import glob
+import sqlite3
+import hashlib
+import tempfile
+import io
+import zipfile
+import xml.etree.ElementTree as ElementTree
+import threading
+import time
+import select
+import struct
+import ctypes
+import cProfile
+import tracemalloc
+import functools
+import inspect
+import itertools
+import uuid
+from collections import Counter, deque
+from datetime import date, timedelta
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
 import streamlit as st
-import matplotlib.pyplot as plt
 import pandas as pd
+import numpy as np
 
 # List of countries in Africa
 payees_afrique = [
@@ -13,75 +35,1967 @@ payees_afrique = [
 # Client and intervention databases
 CLIENTS_DB = "clients.json"
 INTERVENTIONS_DB = "interventions.json"  # File to store interventions
+# Data kept on this machine only, outside the synced folder
+LOCAL_DATA_PATH = os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "GMAO")
+# Index of the documents stored in the folder tree: one SQLite file per tree in
+# this folder, rebuilt locally instead of being synced with every change
+CATALOG_PATH = os.environ.get("GMAO_CATALOG_PATH", os.path.join(LOCAL_DATA_PATH, "catalogs"))
+LEGACY_CATALOG_DB = "catalog.db"  # Where the catalog was kept inside the tree before
+# Content-addressed store holding each distinct uploaded file once. It must be
+# outside the synced folder and on the same drive for uploads to be hard-linked
+# from it. This only saves local disk: sync clients upload every hard link as
+# a full file, so the synced share still holds one copy per document.
+BLOB_PATH = os.environ.get("GMAO_BLOB_PATH", os.path.join(LOCAL_DATA_PATH, "blobs"))
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Bytes copied at a time when storing an upload
+# Parallel folder scans: worker threads and rows per streamed batch
+SCAN_WORKERS = int(os.environ.get("GMAO_SCAN_WORKERS", "8"))
+SCAN_BATCH_SIZE = 500
+# Charts: "matplotlib" renders cached PNG images, "native" uses Streamlit's own charts
+CHART_BACKENDS = ["matplotlib", "native"]
+CHART_BACKEND = os.environ.get("GMAO_CHARTS", "matplotlib")
+CHART_CACHE_ENTRIES = 64
+
+# Background reconciliation of files added or removed outside the app
+WATCH_DOCUMENTS = os.environ.get("GMAO_WATCH", "1") != "0"
+WATCH_INTERVAL = float(os.environ.get("GMAO_WATCH_INTERVAL", "30"))  # Seconds between polling cycles
+# Background jobs: uploads, folder creation and scans run on a worker pool
+# shared by all sessions, at most JOBS_PER_USER at a time per session.
+# GMAO_JOBS=0 runs them inline in the script instead.
+BACKGROUND_JOBS = os.environ.get("GMAO_JOBS", "1") != "0"
+JOB_WORKERS = int(os.environ.get("GMAO_JOB_WORKERS", "4"))
+JOBS_PER_USER = int(os.environ.get("GMAO_JOBS_PER_USER", "2"))
+JOB_POLL_INTERVAL = 1.0  # Seconds between refreshes of the jobs panel while jobs run
+JOB_HISTORY = 10  # Finished jobs kept per session
+JOB_SESSION_TTL = 3600  # Seconds after which the finished jobs of an idle session are forgotten
+# Lazy folders: create only the client folder up front, month/doc_type folders on first upload
+LAZY_FOLDERS = os.environ.get("GMAO_LAZY_FOLDERS", "1") != "0"
 PASSWORD = "0000"  # Password for modifications
 
-# New database path for storage
-base_path = "C:\\Users\\fer1cas\\OneDrive - Bosch Group\\New GMAO TEST"
+# New database path for storage (GMAO_BASE_PATH overrides it, e.g. for a local copy)
+base_path = os.environ.get("GMAO_BASE_PATH", "C:\\Users\\fer1cas\\OneDrive - Bosch Group\\New GMAO TEST")
+
+# Folder layout: <classification>/<payee>/<client>/<year>/<month>/<doc_type>/<file>
+CLASSIFICATIONS = ['Sacofrina', 'Others']
+SECTORS = ['Agro', 'Textile', 'Refining']
+BURNER_TYPES = ['Saacke SKVA', 'Saacke SKVGA', 'Weishaupt']
+FIRST_YEAR = 2024  # First year with documents in the tree
+LEGACY_YEAR = "2024"  # Year given to month folders of the old layout without a year level
+LEGACY_CHECK_INTERVAL = 600  # Seconds between checks for month folders of the old layout
+YEARS = [str(year) for year in range(FIRST_YEAR, date.today().year + 2)]
+MONTHS = [str(i).zfill(2) for i in range(1, 13)]
+OFFER_TYPES = ["Service_Offer", "PDR_Offer"]
+BC_TYPES = ["Service_BC", "PDR_BC"]
+DOC_TYPES = [
+    "Intervention_Report", "Service_Offer", "PDR_Offer",
+    "Service_BC", "PDR_BC", "Documentation"
+]
+
+# Instrumentation: timing spans and filesystem call counters. Samples are kept
+# per span name (and per menu entry) for the Performance screen; with
+# GMAO_PROFILE_DIR set every rerun is also profiled to a .prof file there.
+METRICS_SAMPLES = 1000  # Samples kept per span name
+PROFILE_DIR = os.environ.get("GMAO_PROFILE_DIR")
+# Filesystem functions whose calls are counted per rerun: label -> (module, function name)
+FS_CALLS = {"exists": (os.path, "exists"), "makedirs": (os, "makedirs"), "scandir": (os, "scandir"),
+            "listdir": (os, "listdir")}
+
+# Span samples and the per-thread state of the rerun being measured, shared by all sessions
+@st.cache_resource
+def instrumentation():
+    return {"spans": {}, "screens": {}, "lock": threading.Lock(), "rerun": threading.local()}
+
+# Per-thread state of the measured rerun (counts, spans and the lock guarding
+# them, shared with the pool threads bound to it), looked up once per script run
+@functools.cache
+def rerun_state():
+    return instrumentation()["rerun"]
+
+# Start and stop measuring a rerun on the calling thread; stop returns (counts, spans)
+def start_rerun_measure():
+    rerun = rerun_state()
+    rerun.counts, rerun.spans, rerun.lock = Counter(), Counter(), threading.Lock()
+
+def stop_rerun_measure():
+    rerun = rerun_state()
+    measured = rerun.counts, rerun.spans
+    rerun.counts = rerun.spans = rerun.lock = None
+    return measured
+
+# The app's filesystem calls go through these wrappers, which count them into
+# the rerun being measured (on its thread, or on pool threads bound to it)
+def counted_fs_call(label):
+    module, attribute = FS_CALLS[label]
+
+    def counted(*args, **kwargs):
+        rerun = rerun_state()
+        counts = getattr(rerun, "counts", None)
+        if counts is not None:
+            with rerun.lock:
+                counts[label] += 1
+        return getattr(module, attribute)(*args, **kwargs)
+    counted.__name__ = f"counted_{attribute}"
+    return counted
+
+path_exists = counted_fs_call("exists")
+makedirs = counted_fs_call("makedirs")
+scandir = counted_fs_call("scandir")
+listdir = counted_fs_call("listdir")
+
+# Record one sample of a span, in the shared statistics and in the current rerun
+def record_span(name, seconds):
+    state = instrumentation()
+    with state["lock"]:
+        samples = state["spans"].setdefault(name, deque(maxlen=METRICS_SAMPLES))
+    samples.append(seconds)
+    rerun = rerun_state()
+    spans = getattr(rerun, "spans", None)
+    if spans is not None:
+        with rerun.lock:
+            spans[name] += seconds
+
+# Time a function as the span name. Generators are timed while they produce
+# items only, not while the caller consumes them.
+def timed(name):
+    def decorator(function):
+        if inspect.isgeneratorfunction(function):
+            @functools.wraps(function)
+            def generator_wrapper(*args, **kwargs):
+                elapsed = 0.0
+                iterator = function(*args, **kwargs)
+                try:
+                    while True:
+                        start = time.perf_counter()
+                        try:
+                            item = next(iterator)
+                        except StopIteration:
+                            return
+                        finally:
+                            elapsed += time.perf_counter() - start
+                        yield item
+                finally:
+                    iterator.close()
+                    record_span(name, elapsed)
+            return generator_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record_span(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+# Make function count its filesystem calls into the rerun of the calling
+# thread when it runs on another thread (scan pools)
+def bind_rerun(function):
+    rerun = rerun_state()
+    measure = getattr(rerun, "counts", None), getattr(rerun, "spans", None), getattr(rerun, "lock", None)
+    if measure[0] is None:
+        return function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        saved = getattr(rerun, "counts", None), getattr(rerun, "spans", None), getattr(rerun, "lock", None)
+        rerun.counts, rerun.spans, rerun.lock = measure
+        try:
+            return function(*args, **kwargs)
+        finally:
+            rerun.counts, rerun.spans, rerun.lock = saved
+    return wrapper
+
+# Measure one rerun of a screen: total latency, spans and filesystem calls,
+# optionally under cProfile. The result is kept in the session for the sidebar
+# (also when the screen ends the rerun early with st.rerun or st.stop).
+class RerunTimer:
+    def __init__(self, screen, profile=False):
+        self.screen = screen
+        self.profiler = cProfile.Profile() if profile or PROFILE_DIR else None
+
+    def __enter__(self):
+        start_rerun_measure()
+        if tracemalloc.is_tracing():  # Peak memory of this rerun alone (benchmarks)
+            tracemalloc.reset_peak()
+        if self.profiler:
+            self.profiler.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+        if self.profiler:
+            self.profiler.disable()
+            profile_dir = PROFILE_DIR or os.path.join(tempfile.gettempdir(), "gmao-profiles")
+            os.makedirs(profile_dir, exist_ok=True)
+            name = f"{pd.Timestamp.now():%Y%m%d-%H%M%S-%f}-{self.screen.replace(' ', '_').replace('/', '')}.prof"
+            self.profiler.dump_stats(os.path.join(profile_dir, name))
+        counts, spans = stop_rerun_measure()
+
+        state = instrumentation()
+        with state["lock"]:
+            samples = state["screens"].setdefault(self.screen, deque(maxlen=METRICS_SAMPLES))
+        samples.append((seconds, counts))
+        st.session_state["last_rerun"] = {
+            "screen": self.screen, "seconds": seconds, "fs_calls": dict(counts), "spans": dict(spans), "peak": peak
+        }
+        return False
+
+# p50/p95 latency table (milliseconds) of a {name: samples} mapping
+def latency_table(samples_by_name, index_name):
+    rows = []
+    for name, samples in samples_by_name.items():
+        seconds = pd.Series([sample[0] if isinstance(sample, tuple) else sample for sample in list(samples)])
+        if seconds.empty:
+            continue
+        rows.append({index_name: name, "count": len(seconds), "p50 (ms)": seconds.quantile(0.5) * 1000,
+                     "p95 (ms)": seconds.quantile(0.95) * 1000, "max (ms)": seconds.max() * 1000})
+    return pd.DataFrame(rows, columns=[index_name, "count", "p50 (ms)", "p95 (ms)", "max (ms)"]).round(1)
+
+# Parsed databases shared by all sessions and reruns. Each entry is stored with
+# a signature of its source (file mtime/size, table revision) and stays valid
+# while that signature is unchanged.
+@st.cache_resource
+def json_cache():
+    return {"entries": {}, "hits": 0, "reloads": 0, "lock": threading.Lock()}
+
+# Return the cached data for key, calling loader() only when the signature changed
+def cached_load(key, signature, loader):
+    cache = json_cache()
+    with cache["lock"]:
+        entry = cache["entries"].get(key)
+        if entry is not None and entry[0] == signature:
+            cache["hits"] += 1
+            return entry[1]
+
+    data = loader()
+    with cache["lock"]:
+        cache["entries"][key] = (signature, data)
+        cache["reloads"] += 1
+    return data
+
+# Replace (or drop, with signature None) the cached data for key
+def store_cached(key, signature, data):
+    cache = json_cache()
+    with cache["lock"]:
+        if signature is None:
+            cache["entries"].pop(key, None)
+        else:
+            cache["entries"][key] = (signature, data)
+
+# Load a JSON database, re-parsing it only when the file changed on disk
+@timed("load:json")
+def load_json(file_name, default):
+    path = os.path.join(base_path, file_name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return default
+
+    def loader():
+        with open(path, 'r') as f:
+            return json.load(f)
+    return cached_load(path, (stat.st_mtime_ns, stat.st_size), loader)
+
+# Write a JSON database and refresh its cache entry
+@timed("save:json")
+def save_json(file_name, data):
+    path = os.path.join(base_path, file_name)
+    store_cached(path, None, None)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4)
+    stat = os.stat(path)
+    store_cached(path, (stat.st_mtime_ns, stat.st_size), data)
+
+# Hit rate and reload counts of the JSON cache
+def json_cache_stats():
+    cache = json_cache()
+    with cache["lock"]:
+        hits, reloads = cache["hits"], cache["reloads"]
+    lookups = hits + reloads
+    return {"hits": hits, "reloads": reloads, "hit_rate": hits / lookups if lookups else 0.0}
+
+# Storage backends. GMAO_STORAGE selects where clients, boilers and
+# interventions live: "json" (clients.json / interventions.json, the default)
+# or "sqlite" (gmao.db with row-level writes).
+STORAGE_BACKEND = os.environ.get("GMAO_STORAGE", "json")
+STORAGE_DB = "gmao.db"
+
+# Client fields stored in their own column; boiler serials go to the boilers table
+CLIENT_COLUMNS = ["payee", "address", "contact", "email", "sector", "num_boilers", "burner_type"]
+# Intervention record keys and their column names
+INTERVENTION_COLUMNS = {
+    "Client": "client", "Payee": "payee", "Start Date": "start_date", "End Date": "end_date",
+    "Number of Intervention Days": "num_days", "Technician": "technician", "Status": "status"
+}
+
+# Fields the intervention queries can filter on, and the ones they can sort by
+INTERVENTION_FILTERS = ["Technician", "Client", "Payee", "Status"]
+INTERVENTION_SORT_KEYS = ["Start Date", "End Date", "Client", "Payee", "Technician", "Status",
+                          "Number of Intervention Days"]
+
+# In-memory indexes over an interventions list: positions per filter value, and
+# positions sorted by start date for interval lookups
+class InterventionIndex:
+    def __init__(self, interventions):
+        self.interventions = interventions
+        self.by_field = {key: {} for key in INTERVENTION_FILTERS}
+        for position, intervention in enumerate(interventions):
+            for key in INTERVENTION_FILTERS:
+                self.by_field[key].setdefault(intervention.get(key), []).append(position)
+        self.by_start = sorted(range(len(interventions)), key=lambda position: interventions[position]["Start Date"])
+        self.starts = [interventions[position]["Start Date"] for position in self.by_start]
+
+    # within: optional set of positions the matches are restricted to
+    def query(self, filters, overlap=None, sort_by="Start Date", descending=False, offset=0, limit=None, within=None):
+        positions = within
+        for key, values in filters.items():
+            if values:
+                matched = set()
+                for value in values:
+                    matched.update(self.by_field[key].get(value, ()))
+                positions = matched if positions is None else positions & matched
+        if overlap is not None:
+            start, end = overlap
+            matched = {position for position in self.by_start[:bisect_right(self.starts, end)]
+                       if self.interventions[position]["End Date"] >= start}
+            positions = matched if positions is None else positions & matched
+        if positions is None:
+            positions = range(len(self.interventions))
+
+        ordered = sorted(positions, key=lambda position: (self.interventions[position].get(sort_by), position),
+                         reverse=descending)
+        page = ordered[offset:None if limit is None else offset + limit]
+        return [dict(self.interventions[position], id=position) for position in page], len(ordered)
+
+# Whole-file JSON storage: every write rewrites the file
+class JsonStorage:
+    # The screens add, replace or delete whole clients / interventions,
+    # so a shallow copy keeps the cached data intact
+    def load_clients(self):
+        return dict(load_json(CLIENTS_DB, {}))
+
+    def save_clients(self, clients):
+        save_json(CLIENTS_DB, clients)
+
+    def upsert_client(self, client_name, info):
+        self.upsert_clients({client_name: info})
+
+    def upsert_clients(self, new_clients):
+        clients = self.load_clients()
+        clients.update(new_clients)
+        self.save_clients(clients)
+
+    def delete_client(self, client_name):
+        clients = self.load_clients()
+        clients.pop(client_name, None)
+        self.save_clients(clients)
+
+    def load_interventions(self):
+        return list(load_json(INTERVENTIONS_DB, []))
+
+    def save_interventions(self, interventions):
+        save_json(INTERVENTIONS_DB, interventions)
+
+    def add_intervention(self, intervention):
+        self.add_interventions([intervention])
+
+    def add_interventions(self, new_interventions):
+        interventions = self.load_interventions()
+        interventions.extend(new_interventions)
+        self.save_interventions(interventions)
+
+    # Change whenever clients.json / interventions.json is rewritten
+    def file_signature(self, file_name):
+        try:
+            stat = os.stat(os.path.join(base_path, file_name))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def clients_signature(self):
+        return self.file_signature(CLIENTS_DB)
+
+    def interventions_signature(self):
+        return self.file_signature(INTERVENTIONS_DB)
+
+    # Indexes are rebuilt only when interventions.json changes, the positions
+    # of the interventions of existing clients also when clients.json does;
+    # ids are list positions
+    def query_interventions(self, filters, overlap=None, sort_by="Start Date", descending=False, offset=0, limit=None,
+                            existing_clients=False):
+        signature = self.interventions_signature()
+        if signature is None:
+            return [], 0
+        key = f"{os.path.join(base_path, INTERVENTIONS_DB)}#index"
+        index = cached_load(key, signature, lambda: InterventionIndex(load_json(INTERVENTIONS_DB, [])))
+        within = None
+        if existing_clients:
+            within = cached_load(f"{key}#existing_clients", (signature, self.clients_signature()), lambda: {
+                position for client in self.load_clients() for position in index.by_field["Client"].get(client, ())
+            })
+        return index.query(filters, overlap, sort_by, descending, offset, limit, within)
+
+STORAGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    name TEXT PRIMARY KEY,
+    payee TEXT,
+    address TEXT,
+    contact TEXT,
+    email TEXT,
+    sector TEXT,
+    num_boilers INTEGER,
+    burner_type TEXT,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS boilers (
+    client TEXT NOT NULL REFERENCES clients (name) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    serial_number TEXT NOT NULL,
+    PRIMARY KEY (client, position)
+);
+CREATE TABLE IF NOT EXISTS interventions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    client TEXT,
+    payee TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    num_days INTEGER,
+    technician TEXT,
+    status TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_interventions_technician ON interventions (technician, start_date);
+CREATE INDEX IF NOT EXISTS idx_interventions_client ON interventions (client, start_date);
+CREATE INDEX IF NOT EXISTS idx_interventions_payee ON interventions (payee, start_date);
+CREATE INDEX IF NOT EXISTS idx_interventions_status ON interventions (status, start_date);
+CREATE INDEX IF NOT EXISTS idx_interventions_dates ON interventions (start_date, end_date);
+CREATE TABLE IF NOT EXISTS storage_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO storage_meta VALUES ('clients_revision', 0), ('interventions_revision', 0);
+"""
+# Set as user_version once STORAGE_SCHEMA was applied to the database
+STORAGE_VERSION = 1
+
+# SQLite storage in WAL mode: row-level inserts and updates, safe for several
+# concurrent writers. Each table carries a revision counter bumped by every
+# write, which is what the shared cache is keyed on.
+class SqliteStorage:
+    def path(self):
+        return os.path.join(base_path, STORAGE_DB)
+
+    def connect(self):
+        conn = sqlite3.connect(self.path(), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        # Create and seed the tables only for a new database, so that reads
+        # never open a write transaction
+        if conn.execute("PRAGMA user_version").fetchone()[0] != STORAGE_VERSION:
+            conn.executescript(f"BEGIN IMMEDIATE; {STORAGE_SCHEMA} PRAGMA user_version = {STORAGE_VERSION}; COMMIT;")
+        return conn
+
+    def revision(self, conn, table):
+        return conn.execute("SELECT value FROM storage_meta WHERE key = ?", (f"{table}_revision",)).fetchone()[0]
+
+    def bump(self, conn, table):
+        conn.execute("UPDATE storage_meta SET value = value + 1 WHERE key = ?", (f"{table}_revision",))
+
+    def cached(self, table, loader):
+        with closing(self.connect()) as conn:
+            revision = self.revision(conn, table)
+            return cached_load(f"{self.path()}#{table}", revision, lambda: loader(conn))
+
+    def read_clients(self, conn):
+        serials = {}
+        for client, serial_number in conn.execute("SELECT client, serial_number FROM boilers ORDER BY client, position"):
+            serials.setdefault(client, []).append(serial_number)
+        clients = {}
+        for row in conn.execute(f"SELECT name, {', '.join(CLIENT_COLUMNS)}, extra FROM clients ORDER BY rowid"):
+            info = dict(zip(CLIENT_COLUMNS, row[1:-1]))
+            info["boiler_serial_numbers"] = serials.get(row[0], [])
+            info.update(json.loads(row[-1]) if row[-1] else {})
+            clients[row[0]] = info
+        return clients
+
+    def write_client(self, conn, client_name, info):
+        extra = {k: v for k, v in info.items() if k not in CLIENT_COLUMNS and k != "boiler_serial_numbers"}
+        conn.execute(
+            f"INSERT INTO clients VALUES (?, {', '.join('?' * len(CLIENT_COLUMNS))}, ?) "
+            "ON CONFLICT (name) DO UPDATE SET "
+            + ", ".join(f"{column} = excluded.{column}" for column in CLIENT_COLUMNS + ["extra"]),
+            (client_name, *[info.get(column) for column in CLIENT_COLUMNS], json.dumps(extra) if extra else None)
+        )
+        conn.execute("DELETE FROM boilers WHERE client = ?", (client_name,))
+        conn.executemany(
+            "INSERT INTO boilers VALUES (?, ?, ?)",
+            [(client_name, position, serial) for position, serial in enumerate(info.get("boiler_serial_numbers", []))]
+        )
+
+    def load_clients(self):
+        return dict(self.cached("clients", self.read_clients))
+
+    def save_clients(self, clients):
+        with closing(self.connect()) as conn, conn:
+            existing = [row[0] for row in conn.execute("SELECT name FROM clients")]
+            conn.executemany("DELETE FROM clients WHERE name = ?", [(name,) for name in existing if name not in clients])
+            for client_name, info in clients.items():
+                self.write_client(conn, client_name, info)
+            self.bump(conn, "clients")
+
+    def upsert_client(self, client_name, info):
+        self.upsert_clients({client_name: info})
+
+    def upsert_clients(self, clients):
+        with closing(self.connect()) as conn, conn:
+            for client_name, info in clients.items():
+                self.write_client(conn, client_name, info)
+            self.bump(conn, "clients")
+
+    def delete_client(self, client_name):
+        with closing(self.connect()) as conn, conn:
+            conn.execute("DELETE FROM clients WHERE name = ?", (client_name,))
+            self.bump(conn, "clients")
+
+    def intervention_record(self, row):
+        intervention = dict(zip(INTERVENTION_COLUMNS, row[:-1]))
+        intervention.update(json.loads(row[-1]) if row[-1] else {})
+        return intervention
+
+    def read_interventions(self, conn):
+        return [self.intervention_record(row) for row in conn.execute(
+            f"SELECT {', '.join(INTERVENTION_COLUMNS.values())}, extra FROM interventions ORDER BY id"
+        )]
+
+    def write_intervention(self, conn, intervention):
+        extra = {k: v for k, v in intervention.items() if k not in INTERVENTION_COLUMNS}
+        conn.execute(
+            f"INSERT INTO interventions ({', '.join(INTERVENTION_COLUMNS.values())}, extra) "
+            f"VALUES ({', '.join('?' * (len(INTERVENTION_COLUMNS) + 1))})",
+            (*[intervention.get(key) for key in INTERVENTION_COLUMNS], json.dumps(extra) if extra else None)
+        )
+
+    def load_interventions(self):
+        return list(self.cached("interventions", self.read_interventions))
+
+    def save_interventions(self, interventions):
+        with closing(self.connect()) as conn, conn:
+            conn.execute("DELETE FROM interventions")
+            for intervention in interventions:
+                self.write_intervention(conn, intervention)
+            self.bump(conn, "interventions")
+
+    def add_intervention(self, intervention):
+        self.add_interventions([intervention])
+
+    def add_interventions(self, interventions):
+        with closing(self.connect()) as conn, conn:
+            for intervention in interventions:
+                self.write_intervention(conn, intervention)
+            self.bump(conn, "interventions")
+
+    def clients_signature(self):
+        with closing(self.connect()) as conn:
+            return self.revision(conn, "clients")
+
+    def interventions_signature(self):
+        with closing(self.connect()) as conn:
+            return self.revision(conn, "interventions")
+
+    # Filtering, sorting and paging run in SQL on the interventions indexes
+    def query_interventions(self, filters, overlap=None, sort_by="Start Date", descending=False, offset=0, limit=None,
+                            existing_clients=False):
+        conditions, params = [], []
+        if existing_clients:
+            conditions.append("client IN (SELECT name FROM clients)")
+        for key, values in filters.items():
+            if values:
+                conditions.append(f"{INTERVENTION_COLUMNS[key]} IN ({','.join('?' * len(values))})")
+                params += values
+        if overlap is not None:
+            conditions.append("start_date <= ? AND end_date >= ?")
+            params += [overlap[1], overlap[0]]
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        order = f"{INTERVENTION_COLUMNS[sort_by]} {'DESC' if descending else 'ASC'}, id {'DESC' if descending else 'ASC'}"
+
+        with closing(self.connect()) as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM interventions{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT id, {', '.join(INTERVENTION_COLUMNS.values())}, extra FROM interventions{where} "
+                f"ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [-1 if limit is None else limit, offset]
+            ).fetchall()
+        return [dict(self.intervention_record(row[1:]), id=row[0]) for row in rows], total
+
+STORAGE_BACKENDS = {"json": JsonStorage, "sqlite": SqliteStorage}
+
+# Storage backend selected by GMAO_STORAGE
+def get_storage():
+    return STORAGE_BACKENDS[STORAGE_BACKEND]()
 
 # Load existing clients
+@timed("load:clients")
 def load_clients():
-    if os.path.exists(os.path.join(base_path, CLIENTS_DB)):
-        with open(os.path.join(base_path, CLIENTS_DB), 'r') as f:
-            return json.load(f)
-    return {}
+    return get_storage().load_clients()
 
 # Load existing interventions
+@timed("load:interventions")
 def load_interventions():
-    if os.path.exists(os.path.join(base_path, INTERVENTIONS_DB)):
-        with open(os.path.join(base_path, INTERVENTIONS_DB), 'r') as f:
-            return json.load(f)
-    return []
+    return get_storage().load_interventions()
 
 # Save clients
+@timed("save:clients")
 def save_clients(clients):
-    with open(os.path.join(base_path, CLIENTS_DB), 'w') as f:
-        json.dump(clients, f, indent=4)
+    get_storage().save_clients(clients)
 
 # Save interventions
+@timed("save:interventions")
 def save_interventions(interventions):
-    with open(os.path.join(base_path, INTERVENTIONS_DB), 'w') as f:
-        json.dump(interventions, f, indent=4)
+    get_storage().save_interventions(interventions)
+
+# Create or replace a single client
+def upsert_client(client_name, info):
+    get_storage().upsert_client(client_name, info)
+
+# Create or replace several clients in a single write
+@timed("save:clients_batch")
+def upsert_clients(clients):
+    get_storage().upsert_clients(clients)
+
+# Delete a single client
+def delete_client(client_name):
+    get_storage().delete_client(client_name)
+
+# Append a single intervention
+def add_intervention(intervention):
+    get_storage().add_intervention(intervention)
+
+# Append several interventions in a single write
+@timed("save:interventions_batch")
+def add_interventions(interventions):
+    get_storage().add_interventions(interventions)
+
+# Filtered, sorted page of interventions and the total number of matches.
+# filters maps INTERVENTION_FILTERS keys to accepted values; overlap is an
+# optional (start, end) ISO date range the interventions must intersect;
+# existing_clients leaves out the interventions of deleted clients.
+@timed("query:interventions")
+def query_interventions(filters, overlap=None, sort_by="Start Date", descending=False, offset=0, limit=None,
+                        existing_clients=False):
+    return get_storage().query_interventions(filters, overlap, sort_by, descending, offset, limit, existing_clients)
+
+# One-shot copy of clients.json / interventions.json into the SQLite backend
+def migrate_json_to_sqlite():
+    source, target = JsonStorage(), SqliteStorage()
+    clients = source.load_clients()
+    interventions = source.load_interventions()
+    target.save_clients(clients)
+    target.save_interventions(interventions)
+    return len(clients), len(interventions)
+
+# Document catalog: one row per file of the folder tree, so the search screens
+# answer from indexed queries instead of walking the synced drive on every click
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    classification TEXT NOT NULL,
+    payee TEXT NOT NULL,
+    client TEXT NOT NULL,
+    year TEXT NOT NULL,
+    month TEXT NOT NULL,
+    doc_type TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    content_hash TEXT,
+    PRIMARY KEY (classification, payee, client, year, month, doc_type, file_name)
+);
+CREATE INDEX IF NOT EXISTS idx_documents_lookup ON documents (doc_type, year, payee, client, month);
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+-- Number of documents per folder, kept up to date by the triggers below
+CREATE TABLE IF NOT EXISTS document_counts (
+    classification TEXT NOT NULL,
+    payee TEXT NOT NULL,
+    client TEXT NOT NULL,
+    year TEXT NOT NULL,
+    month TEXT NOT NULL,
+    doc_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (classification, payee, client, year, month, doc_type)
+);
+CREATE INDEX IF NOT EXISTS idx_document_counts_lookup ON document_counts (doc_type, year, payee, client, month);
+CREATE TRIGGER IF NOT EXISTS documents_counted AFTER INSERT ON documents BEGIN
+    INSERT INTO document_counts VALUES (
+        NEW.classification, NEW.payee, NEW.client, NEW.year, NEW.month, NEW.doc_type, 1
+    ) ON CONFLICT (classification, payee, client, year, month, doc_type) DO UPDATE SET count = count + 1;
+END;
+-- Full-text index of the document contents and the file state it was built from
+CREATE VIRTUAL TABLE IF NOT EXISTS document_text USING fts5 (
+    body,
+    classification UNINDEXED, payee UNINDEXED, client UNINDEXED, year UNINDEXED,
+    month UNINDEXED, doc_type UNINDEXED, file_name UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS document_text_state (
+    classification TEXT NOT NULL,
+    payee TEXT NOT NULL,
+    client TEXT NOT NULL,
+    year TEXT NOT NULL,
+    month TEXT NOT NULL,
+    doc_type TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    content_hash TEXT,
+    text_rowid INTEGER NOT NULL,
+    PRIMARY KEY (classification, payee, client, year, month, doc_type, file_name)
+);
+CREATE TRIGGER IF NOT EXISTS documents_uncounted AFTER DELETE ON documents BEGIN
+    UPDATE document_counts SET count = count - 1
+    WHERE classification = OLD.classification AND payee = OLD.payee AND client = OLD.client
+        AND year = OLD.year AND month = OLD.month AND doc_type = OLD.doc_type;
+    DELETE FROM document_counts
+    WHERE classification = OLD.classification AND payee = OLD.payee AND client = OLD.client
+        AND year = OLD.year AND month = OLD.month AND doc_type = OLD.doc_type AND count <= 0;
+END;
+-- Purchase orders (BC) linked to the offer they were raised against, recorded
+-- when the BC is added. Not derived from disk, so kept across rebuilds; links
+-- are dropped once their BC or offer is no longer catalogued. The offer
+-- belongs to the same client folder as the BC.
+CREATE TABLE IF NOT EXISTS document_links (
+    classification TEXT NOT NULL,
+    payee TEXT NOT NULL,
+    client TEXT NOT NULL,
+    bc_year TEXT NOT NULL,
+    bc_month TEXT NOT NULL,
+    bc_doc_type TEXT NOT NULL,
+    bc_file_name TEXT NOT NULL,
+    offer_year TEXT NOT NULL,
+    offer_month TEXT NOT NULL,
+    offer_doc_type TEXT NOT NULL,
+    offer_file_name TEXT NOT NULL,
+    lead_days REAL NOT NULL,
+    linked_at TEXT NOT NULL,
+    PRIMARY KEY (classification, payee, client, bc_year, bc_month, bc_doc_type, bc_file_name)
+);
+CREATE INDEX IF NOT EXISTS idx_document_links_offer ON document_links (
+    classification, payee, client, offer_year, offer_month, offer_doc_type, offer_file_name
+);
+-- Per offer folder: offers with at least one BC, linked BCs and their summed
+-- lead times, kept up to date by the triggers below
+CREATE TABLE IF NOT EXISTS offer_conversions (
+    classification TEXT NOT NULL,
+    payee TEXT NOT NULL,
+    client TEXT NOT NULL,
+    year TEXT NOT NULL,
+    month TEXT NOT NULL,
+    doc_type TEXT NOT NULL,
+    converted INTEGER NOT NULL,
+    bcs INTEGER NOT NULL,
+    lead_days REAL NOT NULL,
+    PRIMARY KEY (classification, payee, client, year, month, doc_type)
+);
+CREATE TRIGGER IF NOT EXISTS document_links_counted AFTER INSERT ON document_links BEGIN
+    INSERT INTO offer_conversions VALUES (
+        NEW.classification, NEW.payee, NEW.client, NEW.offer_year, NEW.offer_month, NEW.offer_doc_type, 1, 1, NEW.lead_days
+    ) ON CONFLICT (classification, payee, client, year, month, doc_type) DO UPDATE SET
+        converted = converted + (SELECT COUNT(*) = 1 FROM document_links WHERE
+            classification = NEW.classification AND payee = NEW.payee AND client = NEW.client AND offer_year = NEW.offer_year
+            AND offer_month = NEW.offer_month AND offer_doc_type = NEW.offer_doc_type AND offer_file_name = NEW.offer_file_name),
+        bcs = bcs + 1,
+        lead_days = lead_days + NEW.lead_days;
+END;
+CREATE TRIGGER IF NOT EXISTS document_links_uncounted AFTER DELETE ON document_links BEGIN
+    UPDATE offer_conversions SET
+        converted = converted - (SELECT COUNT(*) = 0 FROM document_links WHERE
+            classification = OLD.classification AND payee = OLD.payee AND client = OLD.client AND offer_year = OLD.offer_year
+            AND offer_month = OLD.offer_month AND offer_doc_type = OLD.offer_doc_type AND offer_file_name = OLD.offer_file_name),
+        bcs = bcs - 1,
+        lead_days = lead_days - OLD.lead_days
+    WHERE classification = OLD.classification AND payee = OLD.payee AND client = OLD.client
+        AND year = OLD.offer_year AND month = OLD.offer_month AND doc_type = OLD.offer_doc_type;
+    DELETE FROM offer_conversions
+    WHERE classification = OLD.classification AND payee = OLD.payee AND client = OLD.client
+        AND year = OLD.offer_year AND month = OLD.offer_month AND doc_type = OLD.offer_doc_type AND bcs <= 0;
+END;
+"""
+
+# Bumped whenever CATALOG_SCHEMA changes; the derived tables are then rebuilt from disk
+# and all triggers recreated (document_links and offer_conversions are not
+# derived and are never dropped; their lead times are recomputed instead)
+CATALOG_VERSION = 7
+CATALOG_DERIVED_TABLES = ["documents", "catalog_meta", "document_counts", "document_text", "document_text_state"]
+
+# Catalog file of a folder tree, named after the tree's path. A catalog still
+# kept inside the tree is copied over once, with the BC links recorded in it.
+@functools.cache
+def catalog_file(tree, directory):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{hashlib.sha256(os.path.abspath(tree).encode()).hexdigest()[:16]}.db")
+    legacy = os.path.join(tree, LEGACY_CATALOG_DB)
+    if not os.path.exists(path) and os.path.exists(legacy):
+        with closing(sqlite3.connect(legacy, timeout=30)) as source, closing(sqlite3.connect(path)) as target:
+            source.backup(target)
+    return path
+
+# Open the catalog database (created on first use)
+def open_catalog():
+    conn = sqlite3.connect(catalog_file(base_path, CATALOG_PATH), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    upgrade = conn.execute("PRAGMA user_version").fetchone()[0] != CATALOG_VERSION
+    if upgrade:
+        for table in CATALOG_DERIVED_TABLES:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        for (trigger,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+            conn.execute(f"DROP TRIGGER {trigger}")
+    conn.executescript(CATALOG_SCHEMA)
+    if upgrade:
+        with conn:
+            rebuild_offer_conversions(conn)
+            conn.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+    return conn
+
+# Lead time of a BC over its offer in days, from the year/month folders of
+# both (file times tell when a document was uploaded, not when it was issued)
+def link_lead_days(offer_year, offer_month, bc_year, bc_month):
+    try:
+        days = (date(int(bc_year), int(bc_month), 1) - date(int(offer_year), int(offer_month), 1)).days
+    except ValueError:
+        return 0.0
+    return float(max(days, 0))
+
+# Recompute the lead times of the kept links and their per-offer-folder aggregate
+def rebuild_offer_conversions(conn):
+    links = conn.execute("SELECT rowid, offer_year, offer_month, bc_year, bc_month FROM document_links").fetchall()
+    conn.executemany("UPDATE document_links SET lead_days = ? WHERE rowid = ?",
+                     [(link_lead_days(*link[1:]), link[0]) for link in links])
+    conn.execute("DELETE FROM offer_conversions")
+    conn.execute(
+        "INSERT INTO offer_conversions SELECT classification, payee, client, offer_year, offer_month, offer_doc_type, "
+        "COUNT(DISTINCT offer_file_name), COUNT(*), SUM(lead_days) FROM document_links "
+        "GROUP BY classification, payee, client, offer_year, offer_month, offer_doc_type"
+    )
+
+# Columns of the BC and of the offer of a link, in DOCUMENT_FIELDS order
+LINK_COLUMNS = [
+    ["classification", "payee", "client", f"{side}_year", f"{side}_month", f"{side}_doc_type", f"{side}_file_name"]
+    for side in ("bc", "offer")
+]
+
+# Drop the links of documents removed from the catalog; keys are document keys
+# or leading folder fields of removed folders, all of the same length
+def drop_links(conn, keys):
+    if not keys:
+        return
+    for columns in LINK_COLUMNS:
+        where = " AND ".join(f"{column} = ?" for column in columns[:len(keys[0])])
+        conn.executemany(f"DELETE FROM document_links WHERE {where}", keys)
+
+# Drop the links whose BC or offer is not catalogued (after a full rebuild)
+def prune_links(conn):
+    for columns in LINK_COLUMNS:
+        match = " AND ".join(f"d.{field} = document_links.{column}" for field, column in zip(DOCUMENT_FIELDS, columns))
+        conn.execute(f"DELETE FROM document_links WHERE NOT EXISTS (SELECT 1 FROM documents d WHERE {match})")
+
+# Full path of a catalogued document
+def document_path(classification, payee, client, year, month, doc_type, file_name):
+    return os.path.join(base_path, classification, payee, client, year, month, doc_type, file_name)
+
+# Record (or refresh) a document in the catalog after it was written to disk
+def index_document(classification, payee, client, year, month, doc_type, file_name, content_hash=None):
+    stat = os.stat(document_path(classification, payee, client, year, month, doc_type, file_name))
+    with closing(open_catalog()) as conn, conn:
+        conn.execute(
+            "INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (classification, payee, client, year, month, doc_type, file_name) "
+            "DO UPDATE SET size = excluded.size, mtime = excluded.mtime, content_hash = excluded.content_hash",
+            (classification, payee, client, year, month, doc_type, file_name, stat.st_size, stat.st_mtime, content_hash)
+        )
+
+# Drop a document from the catalog after it was removed from disk
+def unindex_document(classification, payee, client, year, month, doc_type, file_name):
+    key = (classification, payee, client, year, month, doc_type, file_name)
+    with closing(open_catalog()) as conn, conn:
+        conn.execute(
+            "DELETE FROM documents WHERE classification = ? AND payee = ? AND client = ? "
+            "AND year = ? AND month = ? AND doc_type = ? AND file_name = ?", key
+        )
+        drop_links(conn, [key])
+
+# File names of the documents catalogued in one folder (offer pickers)
+def list_documents(classification, payee, client, year, month, doc_type):
+    with closing(open_catalog()) as conn:
+        return [row[0] for row in conn.execute(
+            "SELECT file_name FROM documents WHERE classification = ? AND payee = ? AND client = ? "
+            "AND year = ? AND month = ? AND doc_type = ? ORDER BY file_name",
+            (classification, payee, client, year, month, doc_type)
+        )]
+
+# Record that a BC was raised against an offer of the same client; offer is
+# (year, month, doc_type, file_name). Replaces any previous link of the BC.
+def link_document(classification, payee, client, year, month, doc_type, file_name, offer):
+    bc = (classification, payee, client, year, month, doc_type, file_name)
+    lead_days = link_lead_days(offer[0], offer[1], year, month)
+    with closing(open_catalog()) as conn, conn:
+        # Delete first: REPLACE would not run the delete trigger
+        conn.execute(
+            "DELETE FROM document_links WHERE classification = ? AND payee = ? AND client = ? "
+            "AND bc_year = ? AND bc_month = ? AND bc_doc_type = ? AND bc_file_name = ?", bc
+        )
+        conn.execute("INSERT INTO document_links VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))",
+                     (*bc, *offer, lead_days))
+
+# BCs raised against an offer, as (year, month, doc_type, file_name)
+def offer_bcs(classification, payee, client, year, month, doc_type, file_name):
+    with closing(open_catalog()) as conn:
+        return conn.execute(
+            "SELECT bc_year, bc_month, bc_doc_type, bc_file_name FROM document_links "
+            "WHERE classification = ? AND payee = ? AND client = ? AND offer_year = ? AND offer_month = ? "
+            "AND offer_doc_type = ? AND offer_file_name = ? ORDER BY bc_year, bc_month, bc_file_name",
+            (classification, payee, client, year, month, doc_type, file_name)
+        ).fetchall()
+
+# Offer a BC was raised against, as (year, month, doc_type, file_name), or None
+def bc_offer(classification, payee, client, year, month, doc_type, file_name):
+    with closing(open_catalog()) as conn:
+        return conn.execute(
+            "SELECT offer_year, offer_month, offer_doc_type, offer_file_name FROM document_links "
+            "WHERE classification = ? AND payee = ? AND client = ? AND bc_year = ? AND bc_month = ? "
+            "AND bc_doc_type = ? AND bc_file_name = ?",
+            (classification, payee, client, year, month, doc_type, file_name)
+        ).fetchone()
+
+# Number of BCs linked to each of the given documents (7-field catalog rows),
+# counted in one query joining the links to a temporary table of the documents
+def linked_bc_counts(documents):
+    offer = ", ".join(f"l.{column}" for column in LINK_COLUMNS[1])
+    match = " AND ".join(f"w.{field} = l.{column}" for field, column in zip(DOCUMENT_FIELDS, LINK_COLUMNS[1]))
+    with closing(open_catalog()) as conn:
+        conn.execute(f"CREATE TEMP TABLE wanted ({DOCUMENT_KEY}, PRIMARY KEY ({DOCUMENT_KEY}))")
+        conn.executemany("INSERT OR IGNORE INTO wanted VALUES (?, ?, ?, ?, ?, ?, ?)", documents)
+        counts = {row[:7]: row[7] for row in conn.execute(
+            f"SELECT {offer}, COUNT(*) FROM temp.wanted w JOIN document_links l ON {match} GROUP BY {offer}"
+        )}
+    return [counts.get(tuple(document), 0) for document in documents]
+
+# Offers and their conversion into BCs per offer folder for a year: offers
+# from document_counts, converted offers, BCs and summed lead days from
+# offer_conversions (both maintained incrementally by triggers)
+@timed("query:offer_conversions")
+def load_offer_conversions(year, offer_types):
+    placeholders = ','.join('?' * len(offer_types))
+    with closing(open_catalog()) as conn:
+        offers = pd.read_sql_query(
+            f"SELECT {', '.join(FOLDER_FIELDS)}, count AS offers FROM document_counts "
+            f"WHERE year = ? AND doc_type IN ({placeholders})", conn, params=[year, *offer_types]
+        )
+        conversions = pd.read_sql_query(
+            f"SELECT {', '.join(FOLDER_FIELDS)}, converted, bcs, lead_days FROM offer_conversions "
+            f"WHERE year = ? AND doc_type IN ({placeholders})", conn, params=[year, *offer_types]
+        )
+    return offers.merge(conversions, on=FOLDER_FIELDS, how="outer").fillna(
+        {"offers": 0, "converted": 0, "bcs": 0, "lead_days": 0.0}
+    )
+
+# Offers of a year without any BC yet, oldest first
+@timed("query:open_offers")
+def load_open_offers(year, offer_types, limit=500):
+    placeholders = ','.join('?' * len(offer_types))
+    with closing(open_catalog()) as conn:
+        return pd.read_sql_query(
+            "SELECT d.payee, d.client, d.month, d.doc_type, d.file_name, "
+            "CAST(julianday('now') - julianday(d.year || '-' || d.month || '-01') AS INTEGER) AS age_days "
+            f"FROM documents d WHERE d.year = ? AND d.doc_type IN ({placeholders}) AND NOT EXISTS ("
+            "SELECT 1 FROM document_links l WHERE l.classification = d.classification AND l.payee = d.payee "
+            "AND l.client = d.client AND l.offer_year = d.year AND l.offer_month = d.month "
+            "AND l.offer_doc_type = d.doc_type AND l.offer_file_name = d.file_name"
+            ") ORDER BY d.month, d.payee, d.client, d.file_name LIMIT ?", conn, params=[year, *offer_types, limit]
+        )
+
+# Sorted sub-folder names of path (none if it does not exist)
+def list_folders(path):
+    try:
+        return sorted(entry.name for entry in scandir(path) if entry.is_dir())
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+# Whether a folder name is a year partition
+def is_year(name):
+    return len(name) == 4 and name.isdigit()
+
+# Catalog rows for the documents of one client folder. With years given,
+# only those year partitions are read.
+@timed("scan:client")
+def scan_client(classification, payee, client, years=None, months=None, doc_types=None):
+    rows = []
+    client_path = os.path.join(base_path, classification, payee, client)
+    for year in years if years is not None else filter(is_year, list_folders(client_path)):
+        year_path = os.path.join(client_path, year)
+        for month in list_folders(year_path):
+            if month not in MONTHS or (months is not None and month not in months):
+                continue
+            for doc_type in list_folders(os.path.join(year_path, month)):
+                if doc_type not in DOC_TYPES or (doc_types is not None and doc_type not in doc_types):
+                    continue
+                for document in scandir(os.path.join(year_path, month, doc_type)):
+                    if document.is_file():
+                        stat = document.stat()
+                        rows.append((classification, payee, client, year, month, doc_type,
+                                     document.name, stat.st_size, stat.st_mtime))
+    return rows
+
+# Client folders to scan, only those of the given payees/clients if any.
+# Folders are listed rather than probed, so a selection only reaches folders
+# that exist.
+def client_folders(payees=None, clients=None):
+    payees = None if payees is None else set(payees)
+    clients = None if clients is None else set(clients)
+    for classification in CLASSIFICATIONS:
+        classification_path = os.path.join(base_path, classification)
+        for payee in list_folders(classification_path):
+            if payees is not None and payee not in payees:
+                continue
+            for client in list_folders(os.path.join(classification_path, payee)):
+                if clients is None or client in clients:
+                    yield classification, payee, client
+
+# Scan client folders across a thread pool and yield catalog rows in batches
+# as they come back, so callers can display results progressively
+@timed("scan:documents")
+def scan_documents(payees=None, clients=None, years=None, months=None, doc_types=None,
+                   max_workers=None, batch_size=SCAN_BATCH_SIZE, progress=None):
+    with ThreadPoolExecutor(max_workers=max_workers or SCAN_WORKERS) as pool:
+        scan = bind_rerun(scan_client)
+        futures = [pool.submit(scan, *folder, years, months, doc_types) for folder in client_folders(payees, clients)]
+        try:
+            batch = []
+            for done, future in enumerate(as_completed(futures), 1):
+                batch.extend(future.result())
+                if progress:
+                    progress(done / len(futures))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            for future in futures:
+                future.cancel()
+
+# Rebuild the catalog from what is actually on disk. Content hashes are kept
+# for documents whose size and mtime did not change.
+@timed("scan:reconcile")
+def reconcile_catalog(progress=None):
+    with closing(open_catalog()) as conn:
+        known_hashes = {
+            row[:9]: row[9] for row in conn.execute("SELECT * FROM documents WHERE content_hash IS NOT NULL")
+        }
+    rows = [row + (known_hashes.get(row),) for batch in scan_documents(progress=progress) for row in batch]
+    with closing(open_catalog()) as conn, conn:
+        conn.execute("DELETE FROM documents")
+        conn.executemany("INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        prune_links(conn)
+        conn.execute("INSERT OR REPLACE INTO catalog_meta VALUES ('last_reconcile', datetime('now'))")
+    return len(rows)
+
+# Whether the catalog was built from disk at least once
+def catalog_is_ready():
+    with closing(open_catalog()) as conn:
+        return conn.execute("SELECT 1 FROM catalog_meta WHERE key = 'last_reconcile'").fetchone() is not None
+
+# Indexed document lookup used by the search screens
+# (payees/clients of None mean all of them)
+@timed("query:documents")
+def query_documents(payees, clients, doc_type, year, start_month, end_month):
+    if payees == [] or clients == []:
+        return []
+    query = (
+        "SELECT classification, payee, client, year, month, doc_type, file_name FROM documents "
+        "WHERE doc_type = ? AND year = ? AND month BETWEEN ? AND ?"
+    )
+    params = [doc_type, year, start_month, end_month]
+    if payees is not None:
+        query += f" AND payee IN ({','.join('?' * len(payees))})"
+        params += payees
+    if clients is not None:
+        query += f" AND client IN ({','.join('?' * len(clients))})"
+        params += clients
+    query += " ORDER BY payee, client, month, classification, file_name"
+    with closing(open_catalog()) as conn:
+        return conn.execute(query, params).fetchall()
+
+# Per-folder document counts from the aggregate table, as a DataFrame
+# (payees/clients of None mean all of them)
+@timed("query:document_counts")
+def load_document_counts(payees, clients, doc_type, year, start_month, end_month):
+    query = "SELECT * FROM document_counts WHERE doc_type = ? AND year = ? AND month BETWEEN ? AND ?"
+    params = [doc_type, year, start_month, end_month]
+    if payees is not None:
+        query += f" AND payee IN ({','.join('?' * len(payees))})"
+        params += payees
+    if clients is not None:
+        query += f" AND client IN ({','.join('?' * len(clients))})"
+        params += clients
+    with closing(open_catalog()) as conn:
+        return pd.read_sql_query(query, conn, params=params)
+
+# Documents for the search screens, in batches: one batch from the catalog,
+# or a parallel scan of the selected folders while the catalog is not built yet
+@timed("scan:search_documents")
+def search_documents(payees, clients, doc_type, year, start_month, end_month, progress=None):
+    if catalog_is_ready():
+        yield query_documents(payees, clients, doc_type, year, start_month, end_month)
+        return
+    months = [month for month in MONTHS if start_month <= month <= end_month]
+    for batch in scan_documents(payees, clients, [year], months, [doc_type], progress=progress):
+        yield [row[:7] for row in batch]
+
+# Plain text of a DOCX file (the paragraphs of word/document.xml)
+def extract_docx_text(path):
+    namespace = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+    return "\n".join(
+        "".join(node.text or "" for node in paragraph.iter(f"{namespace}t"))
+        for paragraph in root.iter(f"{namespace}p")
+    )
+
+# Plain text of a PDF file (needs pypdf; without it PDFs are indexed without text)
+def extract_pdf_text(path):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return ""
+    return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+TEXT_EXTRACTORS = {".docx": extract_docx_text, ".pdf": extract_pdf_text}
+
+# Text of a stored document; empty for scans and unreadable files
+def extract_text(path):
+    extractor = TEXT_EXTRACTORS.get(os.path.splitext(path)[1].lower())
+    if extractor is None:
+        return ""
+    try:
+        return extractor(path)
+    except Exception:
+        return ""
+
+DOCUMENT_KEY = "classification, payee, client, year, month, doc_type, file_name"
+
+# Bring the full-text index up to date with the catalog: extract the documents
+# that are new or whose size/mtime changed (unless their content hash did not),
+# and drop the ones no longer catalogued. Returns the number of documents read.
+def update_text_index(batch_size=50):
+    with closing(open_catalog()) as conn:
+        pending = conn.execute(
+            f"SELECT d.classification, d.payee, d.client, d.year, d.month, d.doc_type, d.file_name, "
+            f"d.size, d.mtime, d.content_hash, t.content_hash, t.text_rowid "
+            f"FROM documents d LEFT JOIN document_text_state t USING ({DOCUMENT_KEY}) "
+            f"WHERE t.text_rowid IS NULL OR t.size != d.size OR t.mtime != d.mtime"
+        ).fetchall()
+        with conn:
+            conn.execute(
+                f"DELETE FROM document_text WHERE rowid IN (SELECT t.text_rowid FROM document_text_state t "
+                f"LEFT JOIN documents d USING ({DOCUMENT_KEY}) WHERE d.file_name IS NULL)"
+            )
+            conn.execute(
+                f"DELETE FROM document_text_state WHERE ({DOCUMENT_KEY}) NOT IN (SELECT {DOCUMENT_KEY} FROM documents)"
+            )
+
+        extracted = 0
+        for start in range(0, len(pending), batch_size):
+            updates = []
+            for row in pending[start:start + batch_size]:
+                key, size, mtime, content_hash, indexed_hash, text_rowid = row[:7], *row[7:]
+                if content_hash is not None and content_hash == indexed_hash:
+                    updates.append((key, size, mtime, content_hash, text_rowid, None))
+                else:
+                    updates.append((key, size, mtime, content_hash, text_rowid, extract_text(document_path(*key))))
+                    extracted += 1
+            with conn:
+                for key, size, mtime, content_hash, text_rowid, text in updates:
+                    if text is not None:
+                        if text_rowid is not None:
+                            conn.execute("DELETE FROM document_text WHERE rowid = ?", (text_rowid,))
+                        text_rowid = conn.execute(
+                            f"INSERT INTO document_text (body, {DOCUMENT_KEY}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (text, *key)
+                        ).lastrowid
+                    conn.execute(
+                        "INSERT OR REPLACE INTO document_text_state VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (*key, size, mtime, content_hash, text_rowid)
+                    )
+    return extracted
+
+# State of the background text indexer, shared by all sessions
+@st.cache_resource
+def text_indexer():
+    return {"thread": None, "lock": threading.Lock(), "last_run": None, "extracted": 0, "error": None}
+
+# Run update_text_index() in a background thread unless a run is already going on
+def start_text_indexer():
+    state = text_indexer()
+
+    def run():
+        try:
+            state["extracted"] += update_text_index()
+            state["error"] = None
+        except Exception as error:
+            state["error"] = str(error)
+        state["last_run"] = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    with state["lock"]:
+        if state["thread"] is not None and state["thread"].is_alive():
+            return
+        state["thread"] = threading.Thread(target=run, name="gmao-text-indexer", daemon=True)
+        state["thread"].start()
+
+# Ranked full-text search; returns (document key..., snippet, score) rows
+@timed("query:full_text")
+def search_text(query, doc_types=None, clients=None, limit=50):
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    if not terms:
+        return []
+    sql = (
+        f"SELECT {DOCUMENT_KEY}, snippet(document_text, 0, '**', '**', ' ... ', 16), bm25(document_text) "
+        "FROM document_text WHERE document_text MATCH ?"
+    )
+    params = [" ".join(terms)]
+    if doc_types:
+        sql += f" AND doc_type IN ({','.join('?' * len(doc_types))})"
+        params += doc_types
+    if clients:
+        sql += f" AND client IN ({','.join('?' * len(clients))})"
+        params += clients
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+    with closing(open_catalog()) as conn:
+        return conn.execute(sql, params).fetchall()
+
+# Folder fields of a directory below base_path, or None if it is not part of the layout
+# (classification, payee, client, year, month, doc_type: between 0 and 6 of them)
+def folder_fields(path):
+    relative = os.path.relpath(path, base_path)
+    parts = [] if relative == "." else relative.split(os.sep)
+    checks = [lambda name: name in CLASSIFICATIONS, None, None, is_year,
+              lambda name: name in MONTHS, lambda name: name in DOC_TYPES]
+    if len(parts) > len(checks) or any(check and not check(part) for part, check in zip(parts, checks)):
+        return None
+    return tuple(parts)
+
+# Watches base_path and pushes documents added, changed or removed outside the
+# app into the catalog. Uses inotify on Linux; elsewhere it polls, re-listing
+# only the directories whose mtime changed since the previous cycle.
+class DocumentWatcher:
+    IN_EVENTS = 0x2 | 0x8 | 0x40 | 0x80 | 0x100 | 0x200 | 0x400  # modify, close_write, moves, create, delete(_self)
+
+    def __init__(self, interval=WATCH_INTERVAL):
+        self.interval = interval
+        self.dir_mtimes = {}
+        self.stop_event = threading.Event()
+        self.inotify_fd = None
+        self.watches = {}
+        self.retry = set()  # Directories whose last re-listing failed
+        self.metrics = {
+            "mode": None, "cycles": 0, "dirs_checked": 0, "dirs_rescanned": 0, "documents_added": 0,
+            "documents_removed": 0, "last_lag": None, "max_lag": 0.0, "last_cycle": None, "error": None
+        }
+
+    def start_inotify(self):
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return False
+        if fd < 0:
+            return False
+        self.libc, self.inotify_fd = libc, fd
+        return True
+
+    def watch(self, path):
+        if self.inotify_fd is not None:
+            wd = self.libc.inotify_add_watch(self.inotify_fd, os.fsencode(path), self.IN_EVENTS)
+            if wd >= 0:
+                self.watches[wd] = path
+
+    # Directories with inotify events since the last call (waits up to timeout)
+    def read_events(self, timeout):
+        dirty = set()
+        if select.select([self.inotify_fd], [], [], timeout)[0]:
+            time.sleep(1)  # Let a burst of events (a copied folder, a sync) settle
+            while True:
+                try:
+                    data = os.read(self.inotify_fd, 65536)
+                except BlockingIOError:
+                    break
+                offset = 0
+                while offset < len(data):
+                    wd, _, _, length = struct.unpack_from("iIII", data, offset)
+                    name = os.fsdecode(data[offset + 16:offset + 16 + length].rstrip(b"\0"))
+                    offset += 16 + length
+                    path = self.watches.get(wd)
+                    # Above the doc_type level only layout folders matter (not clients.json and friends)
+                    if path and (not name or len(folder_fields(path)) == len(FOLDER_FIELDS)
+                                 or folder_fields(os.path.join(path, name)) is not None):
+                        dirty.add(path)
+        return dirty
+
+    def forget(self, path):
+        prefix = path + os.sep
+        for known in [known for known in self.dir_mtimes if known == path or known.startswith(prefix)]:
+            del self.dir_mtimes[known]
+        for wd in [wd for wd, watched in self.watches.items() if watched == path or watched.startswith(prefix)]:
+            del self.watches[wd]
+        fields = folder_fields(path)
+        if fields:
+            self.metrics["documents_removed"] += unindex_folder(fields)
+
+    # Re-list one directory; on an error (a folder locked by the sync client,
+    # a busy catalog) it is kept for the next cycle to retry
+    def rescan(self, path):
+        try:
+            self.list_directory(path)
+        except (OSError, sqlite3.Error) as error:
+            self.dir_mtimes.setdefault(path, None)
+            self.retry.add(path)
+            self.metrics["error"] = str(error)
+
+    # Follow new and vanished sub-folders of a directory, and for a doc_type
+    # folder bring the catalog in line with its files
+    def list_directory(self, path):
+        try:
+            self.dir_mtimes[path] = os.stat(path).st_mtime_ns
+            entries = list(scandir(path))
+        except FileNotFoundError:
+            self.forget(path)
+            return
+        self.metrics["dirs_rescanned"] += 1
+        fields = folder_fields(path)
+
+        if len(fields) == len(FOLDER_FIELDS):
+            files = {}
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    files[entry.name] = (stat.st_size, stat.st_mtime)
+            added, removed = sync_folder(fields, files)
+            self.metrics["documents_added"] += len(added)
+            self.metrics["documents_removed"] += removed
+            if added:
+                lag = time.time() - min(files[name][1] for name in added)
+                self.metrics["last_lag"] = lag
+                self.metrics["max_lag"] = max(self.metrics["max_lag"], lag)
+            return
+
+        children = {entry.path for entry in entries if entry.is_dir() and folder_fields(entry.path) is not None}
+        for known in [known for known in self.dir_mtimes if os.path.dirname(known) == path and known not in children]:
+            self.forget(known)
+        for child in children:
+            if child not in self.dir_mtimes:
+                self.watch(child)
+                self.rescan(child)
+
+    # Polling: stat every known directory, re-list the changed ones
+    def changed_directories(self):
+        changed = []
+        for path, mtime in list(self.dir_mtimes.items()):
+            self.metrics["dirs_checked"] += 1
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    changed.append(path)
+            except FileNotFoundError:
+                changed.append(os.path.dirname(path))
+            except OSError:
+                changed.append(path)
+        return changed
+
+    # Initial pass: walk the whole tree, then drop catalog rows of folders that no longer exist
+    def initial_scan(self):
+        self.watch(base_path)
+        self.rescan(base_path)
+        seen = {folder_fields(path) for path in self.dir_mtimes}
+        with closing(open_catalog()) as conn:
+            catalogued = conn.execute(f"SELECT DISTINCT {', '.join(FOLDER_FIELDS)} FROM documents").fetchall()
+            for fields in catalogued:
+                if fields not in seen:
+                    unindex_folder(fields)
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO catalog_meta VALUES ('last_reconcile', datetime('now'))")
+
+    def cycle(self, dirty):
+        added, removed = self.metrics["documents_added"], self.metrics["documents_removed"]
+        dirty, self.retry = set(dirty) | self.retry, set()
+        for path in sorted(dirty, key=len):
+            if path in self.dir_mtimes or path == base_path:
+                self.rescan(path)
+        self.metrics["cycles"] += 1
+        self.metrics["last_cycle"] = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
+        if (self.metrics["documents_added"], self.metrics["documents_removed"]) != (added, removed):
+            start_text_indexer()
+
+    # Errors are shown in the metrics and the work retried on the next cycle:
+    # the watcher is shared by all sessions and is not restarted
+    def run(self):
+        self.metrics["mode"] = "inotify" if self.start_inotify() else "polling"
+        scanned = False
+        while not self.stop_event.is_set():
+            try:
+                if not scanned:
+                    self.initial_scan()
+                    scanned = True
+                elif self.inotify_fd is not None:
+                    dirty = self.read_events(self.interval)
+                    self.metrics["dirs_checked"], self.metrics["dirs_rescanned"] = len(dirty), 0
+                    self.cycle(dirty)
+                else:
+                    self.stop_event.wait(self.interval)
+                    self.metrics["dirs_checked"] = self.metrics["dirs_rescanned"] = 0
+                    self.cycle(self.changed_directories())
+                if not self.retry:
+                    self.metrics["error"] = None
+            except Exception as error:
+                self.metrics["error"] = str(error)
+                self.stop_event.wait(self.interval)
+
+# Bring the catalog rows of one doc_type folder in line with files ({name: (size, mtime)});
+# returns the names added or changed and the number of rows removed
+def sync_folder(fields, files):
+    where = " AND ".join(f"{field} = ?" for field in FOLDER_FIELDS)
+    with closing(open_catalog()) as conn, conn:
+        catalogued = {name: (size, mtime) for name, size, mtime in
+                      conn.execute(f"SELECT file_name, size, mtime FROM documents WHERE {where}", fields)}
+        added = [name for name, stat in files.items() if catalogued.get(name) != stat]
+        removed = [name for name in catalogued if name not in files]
+        conn.executemany(
+            "INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL) "
+            f"ON CONFLICT ({DOCUMENT_KEY}) DO UPDATE SET size = excluded.size, mtime = excluded.mtime, content_hash = NULL",
+            [(*fields, name, *files[name]) for name in added]
+        )
+        conn.executemany(f"DELETE FROM documents WHERE {where} AND file_name = ?", [(*fields, name) for name in removed])
+        drop_links(conn, [(*fields, name) for name in removed])
+    return added, len(removed)
+
+# Drop the catalog rows below a folder (given by its leading folder fields)
+def unindex_folder(fields):
+    if not fields:
+        return 0
+    where = " AND ".join(f"{field} = ?" for field in FOLDER_FIELDS[:len(fields)])
+    with closing(open_catalog()) as conn, conn:
+        drop_links(conn, [tuple(fields)])
+        return conn.execute(f"DELETE FROM documents WHERE {where}", fields).rowcount
+
+# The background watcher shared by all sessions (started on first use)
+@st.cache_resource
+def document_watcher():
+    watcher = DocumentWatcher()
+    threading.Thread(target=watcher.run, name="gmao-document-watcher", daemon=True).start()
+    return watcher
+
+# Copy a file-like object to a temporary file of directory in fixed-size
+# chunks, hashing it on the way. Returns (temporary path, hash, size).
+def write_upload(fileobj, directory, progress=None):
+    digest = hashlib.sha256()
+    if progress:
+        position = fileobj.tell()
+        total = fileobj.seek(0, os.SEEK_END) - position
+        fileobj.seek(position)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            copied = 0
+            while True:
+                chunk = fileobj.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+                copied += len(chunk)
+                if progress:
+                    progress(copied / total if total else 1.0)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), copied
+
+# SHA-256 of a file, read in fixed-size chunks
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Path of the blob of a content hash
+def blob_path(content_hash):
+    return os.path.join(BLOB_PATH, content_hash[:2], content_hash)
+
+# Whether a blob still holds the content it is named after (a document linked
+# to it may have been edited in place)
+def blob_is_intact(path, size, content_hash):
+    try:
+        if os.stat(path).st_size != size:
+            return False
+        return file_hash(path) == content_hash
+    except FileNotFoundError:
+        return False
+
+# os.replace that also replaces a read-only target (refused on Windows)
+def replace_file(source, target):
+    try:
+        os.replace(source, target)
+    except PermissionError:
+        if not path_exists(target):
+            raise
+        os.chmod(target, 0o644)
+        os.replace(source, target)
+
+# Make a stored file the blob of its content by hard-linking it into the store
+# (replacing a blob whose content changed). Nothing is kept where the store
+# cannot link to the file, so no content is ever written twice.
+def add_blob(path, content_hash):
+    blob = blob_path(content_hash)
+    link_path = f"{blob}.{uuid.uuid4().hex}.tmp"
+    try:
+        makedirs(os.path.dirname(blob), exist_ok=True)
+        os.link(path, link_path)
+    except OSError:
+        return
+    try:
+        replace_file(link_path, blob)
+    except BaseException:
+        os.remove(link_path)
+        raise
+
+# Store an uploaded file at save_path; returns its content hash. Content
+# already in the blob store is hard-linked from there once its size and hash
+# were checked again; new content is written to save_path and added to the
+# store. Documents stay writable: editors that save in place (rather than
+# writing a new file) change every document sharing the blob.
+@timed("save:document")
+def store_document(fileobj, save_path, progress=None):
+    fileobj.seek(0)
+    makedirs(os.path.dirname(save_path), exist_ok=True)
+    tmp_path, content_hash, size = write_upload(fileobj, os.path.dirname(save_path), progress)
+    try:
+        blob = blob_path(content_hash)
+        if blob_is_intact(blob, size, content_hash):
+            try:
+                os.link(blob, tmp_path + ".link")
+                os.replace(tmp_path + ".link", tmp_path)
+            except OSError:
+                pass  # Drive without hard links: keep the written file
+        else:
+            add_blob(tmp_path, content_hash)
+        # Same content uploaded again under the same name: both names are links
+        # to the blob, and renaming a file onto itself leaves the source in place
+        if path_exists(save_path) and os.path.samefile(tmp_path, save_path):
+            os.remove(tmp_path)
+            return content_hash
+        replace_file(tmp_path, save_path)
+    except BaseException:
+        for path in (tmp_path, tmp_path + ".link"):
+            if path_exists(path):
+                os.remove(path)
+        raise
+    return content_hash
+
+# Raised inside a job function when its job was cancelled
+class JobCancelled(Exception):
+    pass
+
+# One background operation. The job function receives the job as its first
+# argument, reports progress through it (which is also where cancellation is
+# noticed) and returns its result; message is shown in the jobs panel. Jobs
+# that find rows publish them as they go, for the screens to show early.
+class Job:
+    def __init__(self, job_id, user, label, function, args):
+        self.id, self.user, self.label = job_id, user, label
+        self.function, self.args = function, args
+        self.status = "queued"  # queued, running, done, failed or cancelled
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.partial = []  # Rows published so far
+        self.cancel_event = threading.Event()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def report(self, progress, message=None):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+        self.progress = min(max(progress, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    def publish(self, rows):
+        self.partial.extend(rows)
+
+    def run(self):
+        if self.cancel_event.is_set():
+            self.status = "cancelled"
+            return
+        self.status = "running"
+        try:
+            self.result = self.function(self, *self.args)
+            self.progress, self.status = 1.0, "done"
+        except JobCancelled:
+            self.status, self.message = "cancelled", "Cancelled."
+        except Exception as error:
+            self.status, self.message = "failed", str(error)
+        finally:
+            # Only the outcome is kept: not the uploaded file or rows it was given
+            self.function, self.args, self.partial = None, (), []
+
+# Worker pool shared by all sessions. Each user has at most per_user jobs on
+# the pool; further jobs wait in the user's own queue, so one user's scans
+# never hold more than their share of the workers.
+class JobManager:
+    def __init__(self, workers=JOB_WORKERS, per_user=JOBS_PER_USER):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gmao-job")
+        self.per_user = per_user
+        self.jobs = {}
+        self.waiting = {}  # user -> deque of queued jobs beyond the limit
+        self.active = Counter()
+        self.seen = {}  # user -> time the user last submitted or listed jobs
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def submit(self, user, label, function, *args, inline=False):
+        with self.lock:
+            job = Job(next(self.ids), user, label, function, args)
+            self.jobs[job.id] = job
+            self.seen[user] = time.time()
+            self.prune(user)
+            if not inline and self.active[user] < self.per_user:
+                self.start(job)
+            elif not inline:
+                self.waiting.setdefault(user, deque()).append(job)
+        if inline:  # Background jobs disabled: run in the calling script
+            job.run()
+        return job
+
+    # Hand a job to the pool (lock held)
+    def start(self, job):
+        self.active[job.user] += 1
+        self.pool.submit(self.run, job)
+
+    def run(self, job):
+        try:
+            job.run()
+        finally:
+            with self.lock:
+                self.active[job.user] -= 1
+                waiting = self.waiting.get(job.user)
+                if waiting:
+                    self.start(waiting.popleft())
+
+    def cancel(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.done:
+                return
+            job.cancel_event.set()
+            waiting = self.waiting.get(job.user, ())
+            if job in waiting:
+                waiting.remove(job)
+                job.status, job.message = "cancelled", "Cancelled."
+                job.function, job.args = None, ()
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def user_jobs(self, user):
+        with self.lock:
+            self.seen[user] = time.time()
+            return sorted((job for job in self.jobs.values() if job.user == user), key=lambda job: -job.id)
+
+    # Forget the oldest finished jobs of a user beyond JOB_HISTORY, and the
+    # finished jobs of sessions idle for JOB_SESSION_TTL (lock held)
+    def prune(self, user):
+        finished = sorted(job.id for job in self.jobs.values() if job.user == user and job.done)
+        for job_id in finished[:-JOB_HISTORY]:
+            del self.jobs[job_id]
+        idle = {other for other, seen in self.seen.items() if time.time() - seen > JOB_SESSION_TTL}
+        for job_id in [job.id for job in self.jobs.values() if job.user in idle and job.done]:
+            del self.jobs[job_id]
+        for other in idle - {job.user for job in self.jobs.values()}:
+            del self.seen[other]
+            self.waiting.pop(other, None)
+            self.active.pop(other, None)
+
+# The job pool shared by all sessions
+@st.cache_resource
+def job_manager():
+    return JobManager()
+
+# Identifier of the current user for the per-user job limit: one per browser session
+def session_user():
+    if "job_user" not in st.session_state:
+        st.session_state["job_user"] = uuid.uuid4().hex
+    return st.session_state["job_user"]
+
+# Run function(job, *args) as a background job of the current user, or inline
+# when background jobs are disabled (the returned job is then already finished)
+def submit_job(label, function, *args):
+    return job_manager().submit(session_user(), label, function, *args, inline=not BACKGROUND_JOBS)
+
+# Tell the user what became of a job just submitted
+def report_job(job):
+    if job.status == "done":
+        st.success(job.message or f"{job.label}: done.")
+    elif job.status == "failed":
+        st.error(f"{job.label} failed: {job.message}")
+    elif job.status == "cancelled":
+        st.warning(f"{job.label} was cancelled.")
+    else:
+        st.info(f"{job.label} is running in the background; follow its progress in the sidebar.")
+
+# Show the results of the job whose id is kept under key in the session
+# state with render(rows): the rows published so far while it runs, then its
+# result once it finished successfully
+def show_job_results(key, render):
+    job = job_manager().get(st.session_state.get(key))
+    if job is None:
+        return
+    if not job.done:
+        poll_job_results(job.id, render)
+    elif job.status == "done":
+        render(job.result)
+    else:
+        report_job(job)
+
+# Refreshes the partial results of a running job; the whole page reruns once
+# it finished to show the final result
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def poll_job_results(job_id, render):
+    job = job_manager().get(job_id)
+    if job is None or job.done:
+        st.rerun()
+    st.info(f"{job.label}: {job.progress:.0%} done. Results are added below as they are found.")
+    rows = list(job.partial)
+    if rows:
+        render(rows)
+
+# Jobs of this session in the sidebar, with progress and cancel buttons
+def render_jobs(jobs):
+    st.subheader("Background Jobs")
+    for job in jobs:
+        if job.done:
+            status = {"done": "Done", "failed": "Failed", "cancelled": "Cancelled"}[job.status]
+            st.caption(f"{job.label}: {status}. {job.message}")
+        else:
+            st.progress(job.progress, text=f"{job.label} ({job.status})")
+            st.button("Cancel", key=f"cancel_job_{job.id}", on_click=job_manager().cancel, args=(job.id,))
+
+# Refreshes the jobs panel while jobs run; the whole page reruns once they
+# are all finished so that screens waiting on a result show it
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def poll_jobs():
+    jobs = job_manager().user_jobs(session_user())
+    render_jobs(jobs)
+    if all(job.done for job in jobs):
+        st.rerun()
+
+def show_jobs():
+    if not BACKGROUND_JOBS:
+        return
+    jobs = job_manager().user_jobs(session_user())
+    if not jobs:
+        return
+    with st.sidebar:
+        if any(not job.done for job in jobs):
+            poll_jobs()
+        else:
+            render_jobs(jobs)
+
+# Job functions: filesystem work of the screens, run by the job pool.
+# offer: (year, month, doc_type, file_name) of the offer a BC is linked to
+def save_document_job(job, fileobj, classification, payee, client, year, month, doc_type, offer=None):
+    save_path = document_path(classification, payee, client, year, month, doc_type, fileobj.name)
+    content_hash = store_document(fileobj, save_path, progress=job.report)
+    index_document(classification, payee, client, year, month, doc_type, fileobj.name, content_hash)
+    start_text_indexer()
+    job.message = f"{doc_type} added for client {client}, month {month}/{year}."
+    if offer:
+        link_document(classification, payee, client, year, month, doc_type, fileobj.name, offer)
+        job.message += f" Linked to the offer: {offer[3]} ({offer[1]}/{offer[0]})."
+    return save_path
+
+def create_client_job(job, client_name, info):
+    # Last point where the job can be cancelled: the folder is never left without its client record
+    job.report(0.0)
+    create_structure(base_path, info["payee"], client_name, date.today().year, info["classification"])
+    job.progress = 0.5
+    upsert_client(client_name, info)
+    job.message = f"Client {client_name} created successfully under payee {info['payee']}."
+
+def search_documents_job(job, payees, clients, doc_type, year, start_month, end_month):
+    documents = []
+    for batch in search_documents(payees, clients, doc_type, year, start_month, end_month, progress=job.report):
+        documents.extend(batch)
+        job.publish(batch)
+    job.message = f"{len(documents)} documents found."
+    return documents
+
+def reconcile_catalog_job(job):
+    count = reconcile_catalog(progress=job.report)
+    start_text_indexer()
+    job.message = f"Document index rebuilt: {count} documents found."
+    return count
+
+def import_clients_job(job, new_clients):
+    commit_import(new_clients, progress=job.report)
+    job.message = f"{len(new_clients)} clients imported."
+
+def migrate_year_layout_job(job):
+    moved = migrate_year_layout()
+    legacy_month_clients.clear()
+    job.message = f"{moved} month folders moved under {LEGACY_YEAR}; document index rebuilt."
+    return moved
+
+def prune_empty_folders_job(job):
+    removed = prune_empty_folders()
+    job.message = f"{removed} empty folders removed."
+    return removed
 
 # Check if the client already exists
 def client_exists(base_path, client_name, payee_name, classification):
     client_path = os.path.join(base_path, classification, payee_name, client_name)
-    return os.path.exists(client_path)
+    return path_exists(client_path)
 
 # Create folder structure
-def create_structure(base_path, payee_name, client_name, year, classification):
+# (in lazy mode only the client folder; add_document() creates the rest on first write)
+@timed("save:create_structure")
+def create_structure(base_path, payee_name, client_name, year, classification, lazy=None):
     classification_path = os.path.join(base_path, classification)
-    os.makedirs(classification_path, exist_ok=True)
+    makedirs(classification_path, exist_ok=True)
 
     payee_path = os.path.join(classification_path, payee_name)
-    os.makedirs(payee_path, exist_ok=True)
+    makedirs(payee_path, exist_ok=True)
 
     client_path = os.path.join(payee_path, client_name)
-    os.makedirs(client_path, exist_ok=True)
+    makedirs(client_path, exist_ok=True)
+
+    if LAZY_FOLDERS if lazy is None else lazy:
+        return
 
     for month in range(1, 13):
         month_str = f"{month:02d}"
-        month_path = os.path.join(client_path, month_str)
-        os.makedirs(month_path, exist_ok=True)
-
-        for doc_type in [
-            "Intervention_Report", "Service_Offer", "PDR_Offer",
-            "Service_BC", "PDR_BC", "Documentation"
-        ]:
-            os.makedirs(os.path.join(month_path, doc_type), exist_ok=True)
+        month_path = os.path.join(client_path, str(year), month_str)
+        makedirs(month_path, exist_ok=True)
+
+        for doc_type in DOC_TYPES:
+            makedirs(os.path.join(month_path, doc_type), exist_ok=True)
+
+# Remove the empty month/doc_type folders of a year (or legacy client) folder;
+# returns the number of folders removed
+def prune_month_folders(path):
+    removed = 0
+    for month in scandir(path):
+        if not (month.is_dir() and month.name in MONTHS):
+            continue
+        for doc_type in scandir(month.path):
+            if doc_type.is_dir() and doc_type.name in DOC_TYPES and not listdir(doc_type.path):
+                os.rmdir(doc_type.path)
+                removed += 1
+        if not listdir(month.path):
+            os.rmdir(month.path)
+            removed += 1
+    return removed
+
+# Remove the empty year/month/doc_type folders left by eager create_structure() calls
+def prune_empty_folders():
+    removed = 0
+    for classification, payee, client in client_folders():
+        client_path = os.path.join(base_path, classification, payee, client)
+        removed += prune_month_folders(client_path)
+        for year in filter(is_year, list_folders(client_path)):
+            year_path = os.path.join(client_path, year)
+            removed += prune_month_folders(year_path)
+            if not listdir(year_path):
+                os.rmdir(year_path)
+                removed += 1
+    return removed
+
+# Free name for path in its folder: path itself, or "<name> (2)<ext>", "<name> (3)<ext>"...
+def free_path(path):
+    stem, extension = os.path.splitext(path)
+    number = 1
+    while os.path.lexists(path):
+        number += 1
+        path = f"{stem} ({number}){extension}"
+    return path
+
+# Move everything in source into the target folder, merging sub-folders that
+# exist on both sides and renaming entries whose name is already taken there;
+# source is removed once empty
+def merge_folder(source, target):
+    for entry in list(scandir(source)):
+        destination = os.path.join(target, entry.name)
+        if entry.is_dir() and os.path.isdir(destination):
+            merge_folder(entry.path, destination)
+        else:
+            os.replace(entry.path, free_path(destination))
+    os.rmdir(source)
+
+# Client folders still holding month folders of the old <client>/<month> layout,
+# whose documents the scans, the catalog and the watcher do not see (tree is
+# the base path the result is cached for)
+@st.cache_data(ttl=LEGACY_CHECK_INTERVAL, show_spinner=False)
+def legacy_month_clients(tree):
+    return [
+        (classification, payee, client) for classification, payee, client in client_folders()
+        if any(name in MONTHS for name in list_folders(os.path.join(tree, classification, payee, client)))
+    ]
+
+# Warn that documents of the old folder layout are missing from a screen
+def warn_legacy_month_folders():
+    legacy = legacy_month_clients(base_path)
+    if legacy:
+        st.warning(f"{len(legacy)} client folders still use the old <client>/<month> layout and their documents "
+                   "are not shown. Move them with 'Move Month Folders into Year Folders' on the Document Index screen.")
+    return legacy
+
+# Move the month folders of the old <client>/<month> layout to <client>/<year>/<month>;
+# returns the number of month folders moved
+def migrate_year_layout(year=LEGACY_YEAR):
+    moved = 0
+    for classification, payee, client in client_folders():
+        client_path = os.path.join(base_path, classification, payee, client)
+        for month in list_folders(client_path):
+            if month not in MONTHS:
+                continue
+            source = os.path.join(client_path, month)
+            target = os.path.join(client_path, year, month)
+            if not path_exists(target):
+                makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(source, target)
+            else:
+                merge_folder(source, target)  # Merge into the existing partition
+            moved += 1
+    reconcile_catalog()
+    return moved
 
 # Interface to create a client with additional information
 def create_client():
     st.header("Create a Client")
-    clients = load_clients()
 
     client_name = st.text_input('Client Name')
     payee_name = st.selectbox('Select the payee in Africa', payees_afrique)
-    classification = st.selectbox('Select the client classification', ['Sacofrina', 'Others'])
+    classification = st.selectbox('Select the client classification', CLASSIFICATIONS)
 
     address = st.text_input('Address')
     contact = st.text_input('Contact')
     email = st.text_input('Email')
-    sector = st.selectbox('Sector of Activity', ['Agro', 'Textile', 'Refining'])
+    sector = st.selectbox('Sector of Activity', SECTORS)
 
     num_boilers = st.number_input('Number of Boilers', min_value=1, step=1)
     boiler_serial_numbers = []
@@ -90,25 +2004,172 @@ def create_client():
         if serial_number:
             boiler_serial_numbers.append(serial_number)
 
-    burner_type = st.selectbox('Burner Type', ['Saacke SKVA', 'Saacke SKVGA', 'Weishaupt'])
+    burner_type = st.selectbox('Burner Type', BURNER_TYPES)
 
     if st.button('Create Client'):
         if client_exists(base_path, client_name, payee_name, classification):
             st.warning(f"The client '{client_name}' already exists in the specified path.")
         elif client_name and payee_name:
-            create_structure(base_path, payee_name, client_name, 2024, classification)
-            clients[client_name] = {
+            report_job(submit_job(f"Create client {client_name}", create_client_job, client_name, {
                 "payee": payee_name, "address": address, "contact": contact,
                 "email": email, "sector": sector,
                 "num_boilers": num_boilers,
                 "boiler_serial_numbers": boiler_serial_numbers,
-                "burner_type": burner_type
-            }
-            save_clients(clients)
-            st.success(f"Client {client_name} created successfully under payee {payee_name}.")
+                "burner_type": burner_type,
+                "classification": classification
+            }))
         else:
             st.error("Please fill in all required fields.")
 
+# Bulk client/boiler files: one row per boiler, client fields repeated on each row
+IMPORT_COLUMNS = ["Client Name", "Payee", "Classification", "Address", "Contact", "Email",
+                  "Sector", "Burner Type", "Boiler Serial Number"]
+IMPORT_BATCH_SIZE = 5000  # Rows validated at a time
+
+# Read a CSV or Excel file in batches of rows as string DataFrames
+def read_import_batches(file, file_name, batch_size=IMPORT_BATCH_SIZE):
+    if file_name.lower().endswith((".xlsx", ".xls")):
+        sheet = pd.read_excel(file, dtype=str, keep_default_na=False)
+        batches = (sheet.iloc[start:start + batch_size] for start in range(0, len(sheet), batch_size))
+    else:
+        batches = pd.read_csv(file, dtype=str, keep_default_na=False, chunksize=batch_size)
+    for batch in batches:
+        missing = [column for column in IMPORT_COLUMNS if column not in batch.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        yield batch[IMPORT_COLUMNS].apply(lambda column: column.str.strip())
+
+# Validate one batch against the existing clients and the rows accepted so far.
+# Valid rows are merged into new_clients; returns the rejected rows with a reason.
+def validate_import_batch(batch, clients, new_clients, known_serials):
+    reasons = pd.Series("", index=batch.index)
+
+    def reject(mask, reason):
+        reasons[mask & (reasons == "")] = reason
+
+    reject(batch["Client Name"] == "", "missing client name")
+    reject(batch["Client Name"].isin(list(clients.keys())), "client already exists")
+    reject(~batch["Payee"].isin(payees_afrique), "unknown payee")
+    reject(~batch["Classification"].isin(CLASSIFICATIONS), "unknown classification")
+    reject(~batch["Sector"].isin(SECTORS), "unknown sector")
+    reject(~batch["Burner Type"].isin(BURNER_TYPES), "unknown burner type")
+
+    # Serials are checked against the accepted rows only, one row at a time,
+    # so a row is never rejected as the duplicate of a rejected one
+    for row in batch[reasons == ""].itertuples():
+        client_name, payee, classification, address, contact, email, sector, burner_type, serial = row[1:]
+        if serial and serial in known_serials:
+            reasons[row.Index] = "duplicate boiler serial number"
+            continue
+        info = new_clients.get(client_name)
+        if info is None:
+            info = new_clients[client_name] = {
+                "payee": payee, "address": address, "contact": contact,
+                "email": email, "sector": sector,
+                "num_boilers": 0,
+                "boiler_serial_numbers": [],
+                "burner_type": burner_type,
+                "classification": classification
+            }
+        elif (info["payee"], info["classification"]) != (payee, classification):
+            reasons[row.Index] = "payee or classification differs from the client's first row"
+            continue
+        if serial:
+            info["boiler_serial_numbers"].append(serial)
+            known_serials.add(serial)
+        info["num_boilers"] = max(1, len(info["boiler_serial_numbers"]))
+
+    rejected = batch[reasons != ""].copy()
+    rejected.insert(0, "Reason", reasons[reasons != ""])
+    rejected.insert(0, "Row", rejected.index + 2)  # Spreadsheet row, after the header
+    return rejected
+
+# Validate a whole import file; returns the clients to create and the rejected rows
+def import_clients(file, file_name, batch_size=IMPORT_BATCH_SIZE):
+    clients = load_clients()
+    known_serials = {serial for info in clients.values() for serial in info.get("boiler_serial_numbers", [])}
+    new_clients = {}
+    rejected = [validate_import_batch(batch, clients, new_clients, known_serials)
+                for batch in read_import_batches(file, file_name, batch_size)]
+    rejected = pd.concat(rejected) if rejected else pd.DataFrame(columns=["Row", "Reason"] + IMPORT_COLUMNS)
+    return new_clients, rejected
+
+# Create the folders of the imported clients and store them in one write;
+# progress(fraction) is called before each client (and may stop the import)
+def commit_import(new_clients, progress=None):
+    created = {}
+    try:
+        for count, (client_name, info) in enumerate(new_clients.items()):
+            if progress:
+                progress(count / len(new_clients))
+            create_structure(base_path, info["payee"], client_name, date.today().year, info["classification"])
+            created[client_name] = info
+    finally:
+        # Clients whose folders were created are recorded even if the import stops
+        if created:
+            upsert_clients(created)
+
+# Clients and boilers as an import file: one row per boiler. Clients created
+# before classifications were recorded take theirs from their client folder.
+def export_clients_frame(clients):
+    unclassified = [name for name, info in clients.items() if not info.get("classification")]
+    folders = {}
+    if unclassified:
+        for classification, payee, client in client_folders({clients[name]["payee"] for name in unclassified},
+                                                            unclassified):
+            folders.setdefault((payee, client), classification)
+    rows = []
+    for client_name, info in clients.items():
+        classification = info.get("classification") or folders.get((info["payee"], client_name), "")
+        for serial in info.get("boiler_serial_numbers") or [""]:
+            rows.append([client_name, info["payee"], classification, info["address"],
+                         info["contact"], info["email"], info["sector"], info["burner_type"], serial])
+    return pd.DataFrame(rows, columns=IMPORT_COLUMNS)
+
+# Export file of the stored clients ("csv" text or "xlsx" bytes), built when a
+# download button is clicked and cached until the clients change
+def export_clients_file(file_format):
+    storage = get_storage()
+
+    def build():
+        export = export_clients_frame(storage.load_clients())
+        if file_format == "csv":
+            return export.to_csv(index=False)
+        excel = io.BytesIO()
+        export.to_excel(excel, index=False)
+        return excel.getvalue()
+    return cached_load(f"{base_path}#{STORAGE_BACKEND}#export.{file_format}", storage.clients_signature(), build)
+
+# Interface to import and export clients and boilers in bulk
+def bulk_import_export():
+    st.header("Bulk Import / Export")
+
+    st.subheader("Import Clients and Boilers")
+    st.caption(f"CSV or Excel file with one row per boiler and the columns: {', '.join(IMPORT_COLUMNS)}.")
+    import_file = st.file_uploader('Upload the import file', type=['csv', 'xlsx'])
+
+    if import_file and st.button('Check the File'):
+        try:
+            st.session_state["bulk_import"] = import_clients(import_file, import_file.name)
+        except ValueError as error:
+            st.error(str(error))
+
+    if "bulk_import" in st.session_state:
+        new_clients, rejected = st.session_state["bulk_import"]
+        num_boilers = sum(len(info["boiler_serial_numbers"]) for info in new_clients.values())
+        st.write(f"Valid: {len(new_clients)} clients, {num_boilers} boilers. Rejected rows: {len(rejected)}.")
+        if len(rejected):
+            st.dataframe(rejected)
+        if new_clients and st.button('Import the Valid Clients'):
+            del st.session_state["bulk_import"]
+            report_job(submit_job(f"Import {len(new_clients)} clients", import_clients_job, new_clients))
+
+    st.subheader("Export Clients and Boilers")
+    st.download_button('Download CSV', functools.partial(export_clients_file, "csv"), file_name="clients.csv",
+                       mime="text/csv")
+    st.download_button('Download Excel', functools.partial(export_clients_file, "xlsx"), file_name="clients.xlsx",
+                       mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
 # Interface to add reports or offers
 def add_document(doc_type):
     st.header(f"Add a {doc_type}")
@@ -128,19 +2189,24 @@ def add_document(doc_type):
             st.error(f"Error: The client '{client_name}' belongs to the payee '{correct_payee}', not '{payee_name}'. Please correct your selection.")
             return
 
+    year = st.selectbox('Select Year', YEARS, index=YEARS.index(str(date.today().year)))
     month = st.selectbox('Select Month', [str(i).zfill(2) for i in range(1, 13)])
 
     if doc_type == "Service_BC" or doc_type == "PDR_BC":
         st.subheader("Add a Purchase Order (BC)")
         
         # Select existing offer
-        offer_type = st.selectbox("Select Offer Type", ["Service_Offer", "PDR_Offer"])
+        offer_type = st.selectbox("Select Offer Type", OFFER_TYPES)
+        offer_year = st.selectbox('Select Offer Year', YEARS, index=YEARS.index(year))
         offer_month = st.selectbox('Select Offer Month', [str(i).zfill(2) for i in range(1, 13)])
         
-        # Check if offer exists
-        offer_path = os.path.join(base_path, classification, payee_name, client_name, offer_month, offer_type)
-        if os.path.exists(offer_path):
-            offers = glob.glob(os.path.join(offer_path, '*'))
+        # Offers of that month from the document index (or the folder itself until the index is built)
+        if catalog_is_ready():
+            offers = list_documents(classification, payee_name, client_name, offer_year, offer_month, offer_type)
+        else:
+            offer_path = os.path.join(base_path, classification, payee_name, client_name, offer_year, offer_month, offer_type)
+            offers = sorted(entry.name for entry in scandir(offer_path) if entry.is_file()) if os.path.isdir(offer_path) else []
+        if offers:
             offer_selection = st.selectbox("Select an Offer", offers)
         else:
             st.warning("No offers found for this client and month.")
@@ -151,11 +2217,9 @@ def add_document(doc_type):
         
         if st.button(f'Add the {doc_type}'):
             if doc_file:
-                save_path = os.path.join(base_path, classification, payee_name, client_name, month, doc_type, doc_file.name)
-                os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                with open(save_path, 'wb') as f:
-                    f.write(doc_file.getbuffer())
-                st.success(f"{doc_type} added for client {client_name}, month {month}. Linked to the offer: {offer_selection}.")
+                report_job(submit_job(f"Upload {doc_file.name}", save_document_job, doc_file, classification,
+                                      payee_name, client_name, year, month, doc_type,
+                                      (offer_year, offer_month, offer_type, offer_selection)))
             else:
                 st.error(f"Please upload a file for the {doc_type}.")
     else:
@@ -164,11 +2228,8 @@ def add_document(doc_type):
 
         if st.button(f'Add the {doc_type}'):
             if doc_file:
-                save_path = os.path.join(base_path, classification, payee_name, client_name, month, doc_type, doc_file.name)
-                os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                with open(save_path, 'wb') as f:
-                    f.write(doc_file.getbuffer())
-                st.success(f"{doc_type} added for client {client_name}, month {month}.")
+                report_job(submit_job(f"Upload {doc_file.name}", save_document_job, doc_file, classification,
+                                      payee_name, client_name, year, month, doc_type))
             else:
                 st.error(f"Please upload a file for the {doc_type}.")
 
@@ -188,14 +2249,14 @@ def modify_client():
         contact = st.text_input('New Contact', clients[client_name]["contact"])
         email = st.text_input('New Email', clients[client_name]["email"])
 
-        sectors = ['Agro', 'Textile', 'Refining']
+        sectors = SECTORS
         sector = st.selectbox('New Sector of Activity', sectors, index=sectors.index(clients[client_name]["sector"]) if clients[client_name]["sector"] in sectors else 0)
 
         num_boilers = st.number_input('Number of Boilers', min_value=1, step=1, value=clients[client_name].get("num_boilers", 1))
         boiler_serial_numbers = clients[client_name].get("boiler_serial_numbers", [])
 
         # Define burner types
-        burner_types = ['Saacke SKVA', 'Saacke SKVGA', 'Weishaupt']
+        burner_types = BURNER_TYPES
         current_burner_type = clients[client_name].get("burner_type", burner_types[0])
         if current_burner_type not in burner_types:
             current_burner_type = burner_types[0]  # Fallback to the first option if not found
@@ -206,22 +2267,21 @@ def modify_client():
 
         if st.button("Save Changes"):
             if password == PASSWORD:
-                clients[client_name] = {
+                upsert_client(client_name, {
+                    **clients[client_name],  # Keep the fields this screen does not edit
                     "payee": payee_name, "address": address, "contact": contact,
                     "email": email, "sector": sector,
                     "num_boilers": num_boilers,
                     "boiler_serial_numbers": boiler_serial_numbers,
                     "burner_type": burner_type
-                }
-                save_clients(clients)
+                })
                 st.success(f"Data for client '{client_name}' updated successfully.")
             else:
                 st.error("Incorrect password.")
 
         if st.button("Delete Client"):
             if password == PASSWORD:
-                del clients[client_name]
-                save_clients(clients)
+                delete_client(client_name)
                 st.success(f"Client '{client_name}' deleted successfully.")
             else:
                 st.error("Incorrect password.")
@@ -229,6 +2289,7 @@ def modify_client():
 # Interface for quick offer search
 def quick_search_offers():
     st.header("Quick Offer Search")
+    warn_legacy_month_folders()
     clients = load_clients()
 
     if not clients:
@@ -238,36 +2299,98 @@ def quick_search_offers():
     selected_payees = st.multiselect('Select Payees', payees_afrique)
     selected_clients = st.multiselect('Select Clients', list(clients.keys()))
     doc_type = st.selectbox("Type of offer to search", ["Intervention_Report", "Service_Offer", "PDR_Offer"])
+    year = st.selectbox('Year', YEARS, index=YEARS.index(str(date.today().year)))
     start_month = st.text_input('Start Month (01-12)', "01")
     end_month = st.text_input('End Month (01-12)', "12")
 
     if st.button('Search'):
-        results = []
-        for payee in selected_payees:
-            for client in selected_clients:
-                for month in range(int(start_month), int(end_month) + 1):
-                    month_str = str(month).zfill(2)
-                    for classification in ['Sacofrina', 'Others']:
-                        doc_path = os.path.join(base_path, classification, payee, client, month_str, doc_type)
-                        if os.path.exists(doc_path):
-                            documents = glob.glob(os.path.join(doc_path, '*'))
-                            for document in documents:
-                                results.append({
-                                    "Client": client,
-                                    "Date": f"{month_str}/2024",  # Adding year to the date
-                                    "Type": doc_type,
-                                    "File": document
-                                })
-
-        if results:
-            df_results = pd.DataFrame(results)
-            st.dataframe(df_results)  # Display results table
+        search = (selected_payees, selected_clients, doc_type, year,
+                  str(int(start_month)).zfill(2), str(int(end_month)).zfill(2))
+        st.session_state.pop("offer_search_job", None)
+        if catalog_is_ready():
+            show_offer_results(query_documents(*search), doc_type)
+        else:
+            # Scan in the background; the results stay on the screen until the next search
+            st.info("The document index is not built yet: scanning the folders directly. "
+                    "Build it from the Document Index screen for instant searches.")
+            st.session_state["offer_search_job"] = submit_job(f"{doc_type} search", search_documents_job, *search).id
+            st.session_state["offer_search_type"] = doc_type
+
+    doc_type = st.session_state.get("offer_search_type")
+    show_job_results("offer_search_job", lambda documents: show_offer_results(documents, doc_type))
+
+# Results table of the offer search; offers get the number of BCs raised against them
+def show_offer_results(documents, doc_type):
+    results = []
+    for classification, payee, client, year, month_str, doc_type, file_name in documents:
+        results.append({
+            "Client": client,
+            "Date": f"{month_str}/{year}",  # Adding year to the date
+            "Type": doc_type,
+            "File": document_path(classification, payee, client, year, month_str, doc_type, file_name)
+        })
+    if results:
+        df = pd.DataFrame(results)
+        if doc_type in OFFER_TYPES:
+            df["Purchase Orders"] = linked_bc_counts(documents)
+        st.dataframe(df)  # Display results table
+    else:
+        st.warning(f"No {doc_type} found in the selected period.")
+
+# Interface for full-text search in the stored reports and offers
+def full_text_search():
+    st.header("Full-Text Search")
+    warn_legacy_month_folders()
+    clients = load_clients()
+
+    start_text_indexer()
+    state = text_indexer()
+    indexing = state["thread"] is not None and state["thread"].is_alive()
+    st.caption(f"Text index: {'updating in the background' if indexing else 'up to date'}"
+               f" | last run: {state['last_run'] or 'never'}"
+               + (f" | last error: {state['error']}" if state["error"] else ""))
+
+    query = st.text_input('Words to search for (e.g. SKVGA flame failure)')
+    doc_types = st.multiselect('Document Types', DOC_TYPES)
+    selected_clients = st.multiselect('Clients', list(clients.keys()))
+
+    if query:
+        hits = search_text(query, doc_types, selected_clients)
+        if hits:
+            st.dataframe(pd.DataFrame([{
+                "Client": client,
+                "Date": f"{month}/{year}",
+                "Type": doc_type,
+                "Excerpt": snippet,
+                "Score": round(-score, 2),
+                "File": document_path(classification, payee, client, year, month, doc_type, file_name)
+            } for classification, payee, client, year, month, doc_type, file_name, snippet, score in hits]))
         else:
-            st.warning(f"No {doc_type} found in the selected period.")
+            st.warning("No document contains these words.")
+
+# Columns of the document rows returned by the catalog queries
+DOCUMENT_FIELDS = ["classification", "payee", "client", "year", "month", "doc_type", "file_name"]
+FOLDER_FIELDS = ["classification", "payee", "client", "year", "month", "doc_type"]
+
+# Result table of the summary screen, built column-wise from document rows
+@timed("render:summary_table")
+def summary_table(documents):
+    df = pd.DataFrame.from_records(documents, columns=DOCUMENT_FIELDS)
+    file_path = base_path
+    for field in DOCUMENT_FIELDS:
+        file_path = file_path + os.sep + df[field]
+    return pd.DataFrame({
+        "Client": df["client"],
+        "Date": df["month"] + "/" + df["year"],  # Adding year to the date
+        "Type": df["doc_type"],
+        "Count": df.groupby(FOLDER_FIELDS)["file_name"].transform("size"),
+        "File": file_path
+    })
 
 # Interface for Offers and BC Summary
 def bilan_offres_bc():
     st.header("Summary of Offers and BC")
+    warn_legacy_month_folders()
 
     clients = load_clients()
 
@@ -275,89 +2398,413 @@ def bilan_offres_bc():
         st.warning("No clients available.")
         return
 
+    st.caption("Leave payees or clients empty to include all of them.")
     selected_payees = st.multiselect('Select Payees', payees_afrique)
     selected_clients = st.multiselect('Select Clients', list(clients.keys()))
     doc_type = st.selectbox("Select Offer Type", ["Service_Offer", "PDR_Offer", "Service_BC", "PDR_BC"])
 
+    year = st.selectbox('Year', YEARS, index=YEARS.index(str(date.today().year)))
     start_month = st.text_input('Start Month (01-12)', "01")
     end_month = st.text_input('End Month (01-12)', "12")
+    chart_backend = st.radio('Chart', CHART_BACKENDS, index=CHART_BACKENDS.index(CHART_BACKEND), horizontal=True)
 
     if st.button('Generate Summary'):
-        month_counts = {str(i).zfill(2): 0 for i in range(1, 13)}
-        results = []
-
-        for payee in selected_payees:
-            for client in selected_clients:
-                for month in range(int(start_month), int(end_month) + 1):
-                    month_str = str(month).zfill(2)
-                    for classification in ['Sacofrina', 'Others']:
-                        doc_path = os.path.join(base_path, classification, payee, client, month_str, doc_type)
-                        if os.path.exists(doc_path):
-                            documents = glob.glob(os.path.join(doc_path, '*'))
-                            count = len(documents)
-                            month_counts[month_str] += count
-
-                            # Add results for the table
-                            for document in documents:
-                                results.append({
-                                    "Client": client,
-                                    "Date": f"{month_str}/2024",  # Adding year to the date
-                                    "Type": doc_type,
-                                    "Count": count,
-                                    "File": document
-                                })
-
-        # Display results in a table
-        if results:
-            df_results = pd.DataFrame(results)
-            st.dataframe(df_results)  # Display results table
-
-            # Generate the graph
-            months = [month for month, count in month_counts.items() if count > 0]
-            counts = [month_counts[month] for month in months]
-
-            if counts:
-                fig, ax = plt.subplots(figsize=(10, 6))
-                ax.bar(months, counts, color='skyblue')
-                ax.set_xlabel('Months')
-                ax.set_ylabel('Number of Documents')
-                ax.set_title(f"Summary of {doc_type} by Month")
-                st.pyplot(fig)
+        # No selection means the whole company: every folder found
+        payees = selected_payees or None
+        client_names = selected_clients or None
+        summary = (payees, client_names, doc_type, year, str(int(start_month)).zfill(2), str(int(end_month)).zfill(2))
+
+        st.session_state.pop("offers_summary_job", None)
+        if catalog_is_ready():
+            # Documents per folder from the aggregate table
+            show_offers_summary(query_documents(*summary), load_document_counts(*summary), doc_type, chart_backend)
         else:
-            st.warning(f"No {doc_type} found for the selected period.")
+            # Scan in the background; the summary stays on the screen until the next one
+            st.info("The document index is not built yet: scanning the folders directly. "
+                    "Build it from the Document Index screen for instant summaries.")
+            st.session_state["offers_summary_job"] = submit_job(f"{doc_type} summary", search_documents_job, *summary).id
+            st.session_state["offers_summary_type"] = doc_type
+
+    doc_type = st.session_state.get("offers_summary_type")
+    show_job_results("offers_summary_job",
+                     lambda documents: show_offers_summary(documents, scan_counts(documents), doc_type, chart_backend))
+
+# Documents per folder counted from scanned document rows
+def scan_counts(documents):
+    return (pd.DataFrame.from_records(documents, columns=DOCUMENT_FIELDS)
+            .groupby(FOLDER_FIELDS).size().reset_index(name="count"))
+
+# Summary table and monthly chart of the documents found (counts: documents per folder)
+def show_offers_summary(documents, counts, doc_type, chart_backend):
+    if documents:
+        st.dataframe(summary_table(documents))  # Display results table
+        month_counts = counts.pivot_table(index="month", values="count", aggfunc="sum")["count"]
+
+        # Generate the graph
+        if len(month_counts):
+            show_bar_chart(month_counts, f"Summary of {doc_type} by Month", 'Months', 'Number of Documents',
+                           backend=chart_backend)
+    else:
+        st.warning(f"No {doc_type} found for the selected period.")
+
+# Conversion of offers into purchase orders: per payee, client or offer month,
+# the offers issued, how many got a BC, the open backlog and the mean lead time
+CONVERSION_GROUPS = {"Payee": ["payee"], "Client": ["payee", "client"], "Month": ["month"]}
+
+def offer_conversion():
+    st.header("Offer Conversion")
+    warn_legacy_month_folders()
+
+    if not catalog_is_ready():
+        st.warning("The document index is not built yet. Build it from the Document Index screen first.")
+        return
+
+    year = st.selectbox('Year', YEARS, index=YEARS.index(str(date.today().year)))
+    offer_types = st.multiselect('Offer Types', OFFER_TYPES, default=OFFER_TYPES)
+    group = st.radio('Group by', list(CONVERSION_GROUPS), horizontal=True)
+    if not offer_types:
+        return
+
+    folders = load_offer_conversions(year, offer_types)
+    if folders.empty:
+        st.warning(f"No offers found for {year}.")
+        return
+
+    totals = folders[["offers", "converted", "bcs", "lead_days"]].sum()
+    st.write(f"Offers: {totals['offers']:.0f} | converted: {totals['converted']:.0f} "
+             f"({totals['converted'] / totals['offers'] if totals['offers'] else 0:.0%}) | "
+             f"open: {totals['offers'] - totals['converted']:.0f} | "
+             f"mean lead time: {totals['lead_days'] / totals['bcs'] if totals['bcs'] else 0:.1f} days")
+
+    table = folders.groupby(CONVERSION_GROUPS[group])[["offers", "converted", "bcs", "lead_days"]].sum()
+    table["Open Offers"] = table["offers"] - table["converted"]
+    table["Conversion Rate"] = (table["converted"] / table["offers"].where(table["offers"] > 0)).round(3)
+    table["Mean Lead Time (days)"] = (table["lead_days"] / table["bcs"].where(table["bcs"] > 0)).round(1)
+    table = table.rename(columns={"offers": "Offers", "converted": "Converted", "bcs": "Purchase Orders"})
+    st.dataframe(table.drop(columns="lead_days").astype({"Offers": int, "Converted": int, "Purchase Orders": int, "Open Offers": int}))
+
+    with st.expander("Open Offers (oldest first)"):
+        open_offers = load_open_offers(year, offer_types)
+        open_offers.columns = ["Payee", "Client", "Month", "Type", "File", "Age (days)"]
+        st.dataframe(open_offers, hide_index=True)
+
+# Render a bar chart to PNG bytes. Cached on the aggregate values and chart
+# parameters; matplotlib is only imported on the first render and every
+# figure is closed once drawn.
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+@timed("render:bar_chart_image")
+def render_bar_chart(labels, values, title, xlabel, ylabel, figsize=(10, 6), color="skyblue"):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=figsize)
+    try:
+        ax.bar(list(labels), list(values), color=color)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        ax.set_title(title)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", bbox_inches="tight")
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+# Show a bar chart of a series (index as labels) with the selected chart backend
+@timed("render:bar_chart")
+def show_bar_chart(series, title, xlabel, ylabel, backend=None):
+    if (backend or CHART_BACKEND) == "native":
+        st.caption(title)
+        st.bar_chart(series.rename(ylabel).rename_axis(xlabel))
+    else:
+        labels = tuple(str(label) for label in series.index)
+        values = tuple(int(value) for value in series.values)
+        st.image(render_bar_chart(labels, values, title, xlabel, ylabel))
+
+# Admin screen: latency per menu entry and per span, filesystem calls per rerun
+def performance():
+    st.header("Performance")
+    state = instrumentation()
+    with state["lock"]:
+        screens = {name: list(samples) for name, samples in state["screens"].items()}
+        spans = {name: list(samples) for name, samples in state["spans"].items()}
+
+    st.subheader("Menu entries")
+    screen_table = latency_table(screens, "menu entry")
+    for label in FS_CALLS:
+        screen_table[f"{label}/rerun"] = [
+            round(sum(counts[label] for _, counts in screens[name]) / len(screens[name]), 1)
+            for name in screen_table["menu entry"]
+        ]
+    st.dataframe(screen_table, hide_index=True)
+
+    st.subheader("Spans")
+    st.caption("load: database reads, save: writes, scan: filesystem walks, query: index lookups, render: tables and charts")
+    st.dataframe(latency_table(spans, "span").sort_values("p95 (ms)", ascending=False), hide_index=True)
+
+    profile = st.checkbox("Profile my reruns (cProfile)", value=st.session_state.get("profile_reruns", False))
+    st.session_state["profile_reruns"] = profile
+    if profile or PROFILE_DIR:
+        st.caption(f"Profiles are written to {PROFILE_DIR or os.path.join(tempfile.gettempdir(), 'gmao-profiles')}")
+
+    if st.button("Reset statistics"):
+        with state["lock"]:
+            state["screens"].clear()
+            state["spans"].clear()
+        st.success("Statistics reset.")
+
+# Client fields stored as categoricals, with their known values
+FLEET_CATEGORIES = {
+    "payee": payees_afrique, "classification": CLASSIFICATIONS, "sector": SECTORS, "burner_type": BURNER_TYPES
+}
+
+# Clients and boilers as two tables: one row per client with categorical
+# payee/classification/sector/burner type, one row per boiler pointing to its
+# client by position. Boilers are stored grouped by client, so the boilers of
+# a set of clients are contiguous slices (boiler_offsets), and each category
+# value maps to the positions of its clients.
+class FleetModel:
+    def __init__(self, clients):
+        names = list(clients)
+        infos = [clients[name] for name in names]
+        serials = [info.get("boiler_serial_numbers") or [] for info in infos]
+        columns = {"name": names}
+        for field, known in FLEET_CATEGORIES.items():
+            values = [info.get(field) or "" for info in infos]
+            columns[field] = pd.Categorical(values, categories=list(dict.fromkeys(known + sorted(set(values)))))
+        for field in ("address", "contact", "email"):
+            columns[field] = [info.get(field, "") for info in infos]
+        columns["num_boilers"] = [info.get("num_boilers", len(serial)) for serial, info in zip(serials, infos)]
+        self.clients = pd.DataFrame(columns)
+
+        counts = np.fromiter((len(serial) for serial in serials), dtype=np.int64, count=len(names))
+        self.boiler_offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.boilers = pd.DataFrame({
+            "client": np.repeat(np.arange(len(names)), counts),
+            "serial_number": [serial for client_serials in serials for serial in client_serials]
+        })
+        self.index = {field: self.clients.groupby(field, observed=True).indices for field in FLEET_CATEGORIES}
+        self.serial_text = [", ".join(client_serials) for client_serials in serials]
+
+    # Sorted positions of the clients matching every field of filters ({field: accepted values})
+    def client_positions(self, filters):
+        positions = None
+        for field, values in filters.items():
+            if values:
+                matched = [self.index[field][value] for value in values if value in self.index[field]]
+                matched = np.concatenate(matched) if matched else np.array([], dtype=np.int64)
+                positions = np.sort(matched) if positions is None else np.intersect1d(positions, matched)
+        return np.arange(len(self.clients)) if positions is None else positions
+
+    # Client table of the list screen for the given positions
+    def client_table(self, positions):
+        clients = self.clients.take(positions)
+        return pd.DataFrame({
+            "Client Name": clients["name"].values, "Payee": clients["payee"].values,
+            "Address": clients["address"].values, "Contact": clients["contact"].values,
+            "Email": clients["email"].values, "Sector": clients["sector"].values,
+            "Number of Boilers": clients["num_boilers"].values, "Burner Type": clients["burner_type"].values,
+            "Boiler Serial Numbers": [self.serial_text[position] for position in positions]
+        })
+
+    # Boilers of the clients matching filters, with their client's fields
+    def query_boilers(self, filters):
+        positions = self.client_positions(filters)
+        starts = self.boiler_offsets[positions]
+        counts = self.boiler_offsets[positions + 1] - starts
+        rows = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        boilers = self.boilers.take(rows)
+        clients = self.clients.take(boilers["client"].values)
+        return pd.DataFrame({
+            "Boiler Serial Number": boilers["serial_number"].values, "Client Name": clients["name"].values,
+            "Payee": clients["payee"].values, "Classification": clients["classification"].values,
+            "Sector": clients["sector"].values, "Burner Type": clients["burner_type"].values
+        })
+
+# Client/boiler model of the stored clients, rebuilt only when they change
+def fleet_model():
+    storage = get_storage()
+    return cached_load(f"{base_path}#{STORAGE_BACKEND}#fleet", storage.clients_signature(),
+                       lambda: FleetModel(storage.load_clients()))
 
 # Interface to display clients in a table
 def display_clients():
     st.header("Client List")
-    clients = load_clients()
+    model = fleet_model()
 
-    if not clients:
+    if model.clients.empty:
         st.warning("No clients available.")
         return
 
-    # Convert client data to DataFrame
-    data = []
-    for client_name, info in clients.items():
-        data.append({
-            "Client Name": client_name,
-            "Payee": info["payee"],
-            "Address": info["address"],
-            "Contact": info["contact"],
-            "Email": info["email"],
-            "Sector": info["sector"],
-            "Number of Boilers": info["num_boilers"],
-            "Burner Type": info["burner_type"],
-            "Boiler Serial Numbers": ", ".join(info["boiler_serial_numbers"])  # Add serial numbers
-        })
-
-    df = pd.DataFrame(data)
-
     # Filter by payee
     selected_payee = st.selectbox("Filter by Payee", ['All'] + payees_afrique)
-    if selected_payee != 'All':
-        df = df[df["Payee"] == selected_payee]
+    filters = {} if selected_payee == 'All' else {"payee": [selected_payee]}
+    st.dataframe(model.client_table(model.client_positions(filters)))  # Display table
+
+    # Boiler-level search on the category indexes
+    with st.expander("Boiler Search"):
+        filters = {
+            "payee": st.multiselect('Payees', payees_afrique, key="boiler_payees"),
+            "burner_type": st.multiselect('Burner Types', BURNER_TYPES, key="boiler_burner_types"),
+            "sector": st.multiselect('Sectors', SECTORS, key="boiler_sectors"),
+            "classification": st.multiselect('Classifications', CLASSIFICATIONS, key="boiler_classifications"),
+        }
+        boilers = model.query_boilers(filters)
+        st.write(f"{len(boilers)} boilers at {boilers['Client Name'].nunique()} clients")
+        st.dataframe(boilers, hide_index=True)
 
-    st.dataframe(df)  # Display table
+TECHNICIANS = [
+    'Ferjeni Ramzi', 'El Mahi Mouhcine', 
+    'Marzouk Abdelhadi', 'El Najjar Abdessamad', 'Moustafa'
+]
+INTERVENTION_STATUSES = ['Confirm', 'Plan', 'Propose']
+
+LOAD_WINDOW_DAYS = 30  # Days before and after a request counted as a technician's current load
+
+# Booked periods of one technician, sorted by start date, with the running
+# maximum of the end dates: whether a period overlaps a booking is answered
+# by one binary search
+class TechnicianSchedule:
+    def __init__(self):
+        self.bookings = []  # (start, end, intervention) sorted by start
+        self.starts = []
+        self.max_ends = []
+
+    # Replace the bookings with (start, end, intervention) tuples in any order
+    def load(self, bookings):
+        self.bookings = sorted(bookings, key=lambda booking: booking[0])
+        self.starts = [booking[0] for booking in self.bookings]
+        self.max_ends = []
+        for _, end, _ in self.bookings:
+            self.max_ends.append(max(self.max_ends[-1], end) if self.max_ends else end)
+
+    def add(self, start, end, intervention=None):
+        position = bisect_right(self.starts, start)
+        self.bookings.insert(position, (start, end, intervention))
+        self.starts.insert(position, start)
+        self.max_ends.insert(position, max(self.max_ends[position - 1], end) if position else end)
+        # The running maximum only changes until it catches up with the old values
+        for i in range(position + 1, len(self.max_ends)):
+            running_max = max(self.max_ends[i - 1], self.bookings[i][1])
+            if running_max == self.max_ends[i]:
+                break
+            self.max_ends[i] = running_max
+
+    def is_free(self, start, end):
+        position = bisect_right(self.starts, end)
+        return position == 0 or self.max_ends[position - 1] < start
+
+    # Bookings overlapping start..end; walks back only while an overlap is still possible
+    def overlapping(self, start, end):
+        found = []
+        position = bisect_right(self.starts, end) - 1
+        while position >= 0 and self.max_ends[position] >= start:
+            if self.bookings[position][1] >= start:
+                found.append(self.bookings[position])
+            position -= 1
+        return found[::-1]
+
+    # Number of booked days between start and end
+    def booked_days(self, start, end):
+        days = 0
+        for booking_start, booking_end, _ in self.overlapping(start, end):
+            days += (min(end, booking_end) - max(start, booking_start)).days + 1
+        return days
+
+    # First start date on or after start with length free consecutive days, or None past latest_start
+    def first_free_start(self, start, length, latest_start):
+        while start <= latest_start:
+            end = start + timedelta(days=length - 1)
+            conflicts = self.overlapping(start, end)
+            if not conflicts:
+                return start
+            start = max(booking_end for _, booking_end, _ in conflicts) + timedelta(days=1)
+        return None
+
+# Per-technician schedules built from the interventions list. Every
+# technician of the history gets a schedule for conflict checks; only the
+# given technicians are assigned new interventions.
+class SchedulingEngine:
+    def __init__(self, interventions, technicians=TECHNICIANS):
+        self.technicians = list(technicians)
+        bookings = {technician: [] for technician in technicians}
+        for intervention in interventions:
+            bookings.setdefault(intervention["Technician"], []).append((
+                date.fromisoformat(intervention["Start Date"]), date.fromisoformat(intervention["End Date"]),
+                intervention
+            ))
+        self.schedules = {technician: TechnicianSchedule() for technician in bookings}
+        for technician, technician_bookings in bookings.items():
+            self.schedules[technician].load(technician_bookings)
+
+    def book(self, intervention):
+        schedule = self.schedules.setdefault(intervention["Technician"], TechnicianSchedule())
+        schedule.add(date.fromisoformat(intervention["Start Date"]), date.fromisoformat(intervention["End Date"]),
+                     intervention)
+
+    # Interventions of technician overlapping start..end
+    def conflicts(self, technician, start, end):
+        schedule = self.schedules.get(technician)
+        return [booking[2] for booking in schedule.overlapping(start, end)] if schedule else []
+
+    def load(self, technician, start, end):
+        window = timedelta(days=LOAD_WINDOW_DAYS)
+        return self.schedules[technician].booked_days(start - window, end + window)
+
+    # Least-loaded technician free over start..end, or None if everybody is booked
+    def auto_assign(self, start, end):
+        free = [technician for technician in self.technicians if self.schedules[technician].is_free(start, end)]
+        if not free:
+            return None
+        return min(free, key=lambda technician: self.load(technician, start, end))
+
+    # Book a preventive-maintenance visit for each (client, payee, days) request
+    # at the earliest date in the window, on the least-loaded technician free
+    # then. Returns the new interventions and the requests that did not fit.
+    def plan_batch(self, requests, window_start, window_end, status="Plan"):
+        planned, unplanned = [], []
+        for client, payee, days in requests:
+            latest_start = window_end - timedelta(days=days - 1)
+            best = None
+            for technician in self.technicians:
+                start = self.schedules[technician].first_free_start(window_start, days, latest_start)
+                if start is None:
+                    continue
+                end = start + timedelta(days=days - 1)
+                rank = (start, self.load(technician, start, end))
+                if best is None or rank < best[0]:
+                    best = (rank, technician, start, end)
+            if best is None:
+                unplanned.append((client, payee, days))
+                continue
+
+            _, technician, start, end = best
+            intervention = {
+                "Client": client,
+                "Payee": payee,
+                "Start Date": str(start),
+                "End Date": str(end),
+                "Number of Intervention Days": days,
+                "Technician": technician,
+                "Status": status,
+                "Type": "Preventive Maintenance"
+            }
+            self.book(intervention)
+            planned.append(intervention)
+        return planned, unplanned
+
+# Scheduling engine over the stored interventions, rebuilt only when they change
+def scheduling_engine():
+    storage = get_storage()
+    return cached_load(f"{base_path}#{STORAGE_BACKEND}#schedule", storage.interventions_signature(),
+                       lambda: SchedulingEngine(storage.load_interventions()))
+
+# One preventive-maintenance request per client: a day per boiler
+def preventive_maintenance_requests(clients, days_per_boiler=1):
+    return [
+        (client_name, info["payee"], max(1, len(info.get("boiler_serial_numbers", [])) * days_per_boiler))
+        for client_name, info in clients.items()
+    ]
 
 # Adding function for intervention planning
 def planification_interventions():
@@ -389,19 +2836,31 @@ def planification_interventions():
         'Commissioning', 'Energy Audit', 'Other'
     ])
 
-    technician = st.selectbox('Choose Technician', [
-        'Ferjeni Ramzi', 'El Mahi Mouhcine', 
-        'Marzouk Abdelhadi', 'El Najjar Abdessamad', 'Moustafa'
-    ])
+    engine = scheduling_engine()
+    if st.checkbox('Auto-assign the least-loaded free technician'):
+        technician = engine.auto_assign(start_date, end_date)
+        if technician is None:
+            st.error("No technician is free over these dates.")
+            return
+        st.info(f"Proposed technician: {technician}")
+    else:
+        technician = st.selectbox('Choose Technician', TECHNICIANS)
 
-    status = st.selectbox('Intervention Status', ['Confirm', 'Plan', 'Propose'])
+    conflicts = engine.conflicts(technician, start_date, end_date)
+    if conflicts:
+        st.warning(f"{technician} is already booked over these dates:")
+        st.dataframe(pd.DataFrame(conflicts)[["Client", "Start Date", "End Date", "Status"]])
+        plan_anyway = st.checkbox('Plan anyway')
+    else:
+        plan_anyway = True
+
+    status = st.selectbox('Intervention Status', INTERVENTION_STATUSES)
 
     # Calculate the number of intervention days
     num_intervention_days = (end_date - start_date).days + 1
 
-    if st.button('Plan the Intervention'):
+    if st.button('Plan the Intervention', disabled=not plan_anyway):
         # Save the intervention
-        interventions = load_interventions()
         new_intervention = {
             "Client": client_name,
             "Payee": payee_name,
@@ -409,10 +2868,10 @@ def planification_interventions():
             "End Date": str(end_date),
             "Number of Intervention Days": num_intervention_days,
             "Technician": technician,
-            "Status": status
+            "Status": status,
+            "Type": intervention_type
         }
-        interventions.append(new_intervention)
-        save_interventions(interventions)
+        add_intervention(new_intervention)
 
         st.success(f"Intervention planned successfully!\n"
                    f"Client: {client_name}\n"
@@ -423,44 +2882,156 @@ def planification_interventions():
                    f"Technician: {technician}\n"
                    f"Number of Intervention Days: {num_intervention_days}")
 
+    bulk_preventive_planning(clients)
+
+# Plan preventive maintenance for many clients in one pass
+def bulk_preventive_planning(clients):
+    with st.expander("Bulk Preventive Maintenance Planning"):
+        selected_clients = st.multiselect('Clients to plan (all if empty)', list(clients.keys()))
+        window_start = st.date_input('Window Start', key='bulk_window_start')
+        window_end = st.date_input('Window End', window_start + timedelta(days=90), key='bulk_window_end')
+        days_per_boiler = st.number_input('Days per boiler', min_value=1, step=1)
+
+        if st.button('Propose a Plan'):
+            requests = preventive_maintenance_requests(
+                {name: clients[name] for name in selected_clients} if selected_clients else clients, days_per_boiler
+            )
+            engine = SchedulingEngine(load_interventions())
+            st.session_state["bulk_plan"] = engine.plan_batch(requests, window_start, window_end)
+
+        if "bulk_plan" in st.session_state:
+            planned, unplanned = st.session_state["bulk_plan"]
+            if planned:
+                st.dataframe(pd.DataFrame(planned))
+            if unplanned:
+                st.warning("No free slot in the window for: " + ", ".join(client for client, _, _ in unplanned))
+            if planned and st.button('Save the Plan'):
+                add_interventions(planned)
+                del st.session_state["bulk_plan"]
+                st.success(f"{len(planned)} preventive maintenance interventions planned.")
+
 # Function to display intervention summary
+# (filtering, sorting and paging happen in the storage layer; only the page shown is loaded)
 def bilan_interventions():
     st.header("Intervention Summary")
-    interventions = load_interventions()
+    clients = load_clients()
+
+    technicians = st.multiselect('Technicians', TECHNICIANS)
+    selected_clients = st.multiselect('Clients', list(clients.keys()))
+    selected_payees = st.multiselect('Payees', payees_afrique)
+    statuses = st.multiselect('Status', INTERVENTION_STATUSES)
+
+    overlap = None
+    if st.checkbox('Only interventions overlapping a period'):
+        week_start = date.today() - timedelta(days=date.today().weekday())
+        period_start = st.date_input('Period Start', week_start)
+        period_end = st.date_input('Period End', week_start + timedelta(days=6))
+        overlap = (str(period_start), str(period_end))
+
+    sort_by = st.selectbox('Sort by', INTERVENTION_SORT_KEYS)
+    descending = st.checkbox('Descending order')
+    page_size = st.selectbox('Rows per page', [25, 50, 100, 500])
+    page = st.number_input('Page', min_value=1, step=1)
+
+    filters = {
+        "Technician": technicians,
+        "Client": selected_clients,
+        "Payee": selected_payees,
+        "Status": statuses
+    }
+    # Interventions of deleted clients are left out unless clients are picked explicitly
+    interventions, total = query_interventions(filters, overlap, sort_by, descending,
+                                               offset=(page - 1) * page_size, limit=page_size,
+                                               existing_clients=not selected_clients)
 
     if not interventions:
         st.warning("No interventions available.")
         return
 
-        clients = load_clients()
     data = []
-
     for intervention in interventions:
-        client_name = intervention["Client"]
-        payee_name = intervention["Payee"]
-        if client_name in clients:
-            data.append({
-                "Client": client_name,
-                "Payee": payee_name,
-                "Start Date": intervention["Start Date"],
-                "End Date": intervention["End Date"],
-                "Number of Days": intervention["Number of Intervention Days"],
-                "Technician": intervention["Technician"],
-                "Status": intervention["Status"]
-            })
+        data.append({
+            "Client": intervention["Client"],
+            "Payee": intervention["Payee"],
+            "Start Date": intervention["Start Date"],
+            "End Date": intervention["End Date"],
+            "Number of Days": intervention["Number of Intervention Days"],
+            "Technician": intervention["Technician"],
+            "Status": intervention["Status"]
+        })
 
     df = pd.DataFrame(data)
+    st.caption(f"Page {page} of {-(-total // page_size)} ({total} interventions)")
     st.dataframe(df)  # Display intervention summary
 
+# Interface to inspect and rebuild the document catalog
+def document_index():
+    st.header("Document Index")
+
+    with closing(open_catalog()) as conn:
+        num_documents = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        num_contents = conn.execute("SELECT COUNT(DISTINCT content_hash) FROM documents").fetchone()[0]
+        last_reconcile = conn.execute("SELECT value FROM catalog_meta WHERE key = 'last_reconcile'").fetchone()
+
+    st.write(f"Indexed documents: {num_documents}")
+    st.write(f"Distinct contents uploaded through the app: {num_contents}")
+    st.write(f"Last rebuild from disk: {last_reconcile[0] if last_reconcile else 'never'}")
+
+    if st.button('Rebuild Index from Disk'):
+        report_job(submit_job("Rebuild document index", reconcile_catalog_job))
+
+    if WATCH_DOCUMENTS:
+        st.subheader("Background Reconciliation")
+        metrics = document_watcher().metrics
+        st.write(f"Mode: {metrics['mode']} | cycles: {metrics['cycles']} | last cycle: {metrics['last_cycle'] or 'never'}")
+        st.write(f"Last cycle: {metrics['dirs_checked']} directories checked, {metrics['dirs_rescanned']} re-listed")
+        st.write(f"Documents picked up: {metrics['documents_added']} added or changed, {metrics['documents_removed']} removed")
+        if metrics["last_lag"] is not None:
+            st.write(f"Event lag: last {metrics['last_lag']:.1f} s, max {metrics['max_lag']:.1f} s")
+        if metrics["error"]:
+            st.error(f"Watcher error: {metrics['error']}")
+
+    legacy = warn_legacy_month_folders()
+    if legacy:
+        with st.expander("Client folders with month folders of the old layout"):
+            st.dataframe(pd.DataFrame(legacy, columns=["Classification", "Payee", "Client"]))
+    if st.button('Move Month Folders into Year Folders'):
+        report_job(submit_job("Move month folders", migrate_year_layout_job))
+
+    if st.button('Remove Empty Month Folders'):
+        report_job(submit_job("Remove empty month folders", prune_empty_folders_job))
+
 # Main application structure
 def main():
     st.title("Client and Intervention Management System")
 
-    menu = ["Create Client", "Add Document", "Modify Client", "Quick Offer Search",
-            "Summary of Offers and BC", "Display Clients", "Intervention Planning", "Intervention Summary"]
+    menu = ["Create Client", "Add Document", "Modify Client", "Quick Offer Search", "Full-Text Search",
+            "Summary of Offers and BC", "Offer Conversion", "Display Clients", "Intervention Planning",
+            "Intervention Summary", "Bulk Import / Export", "Document Index", "Performance"]
 
     choice = st.sidebar.selectbox("Select an option", menu)
 
+    if WATCH_DOCUMENTS:
+        document_watcher()
+
+    with st.sidebar.expander("Cache statistics"):
+        stats = json_cache_stats()
+        st.write(f"Hits: {stats['hits']} | Reloads: {stats['reloads']} | Hit rate: {stats['hit_rate']:.0%}")
+
+    with st.sidebar.expander("Previous rerun"):
+        last_rerun = st.session_state.get("last_rerun")
+        if last_rerun:
+            st.write(f"{last_rerun['screen']}: {last_rerun['seconds'] * 1000:.0f} ms")
+            st.write(", ".join(f"{name}: {count}" for name, count in sorted(last_rerun["fs_calls"].items()))
+                     or "No filesystem calls")
+
+    with RerunTimer(choice, profile=st.session_state.get("profile_reruns", False)):
+        show_screen(choice)
+
+    show_jobs()
+
+# Run the screen of a menu entry
+def show_screen(choice):
     if choice == "Create Client":
         create_client()
     elif choice == "Add Document":
@@ -470,15 +3041,109 @@ def main():
         modify_client()
     elif choice == "Quick Offer Search":
         quick_search_offers()
+    elif choice == "Full-Text Search":
+        full_text_search()
     elif choice == "Summary of Offers and BC":
         bilan_offres_bc()
+    elif choice == "Offer Conversion":
+        offer_conversion()
     elif choice == "Display Clients":
         display_clients()
     elif choice == "Intervention Planning":
         planification_interventions()
     elif choice == "Intervention Summary":
         bilan_interventions()
+    elif choice == "Bulk Import / Export":
+        bulk_import_export()
+    elif choice == "Document Index":
+        document_index()
+    elif choice == "Performance":
+        performance()
+
+# Command line maintenance tasks: python GMAO260120250.py <command> [args]
+def command_reconcile():
+    print(f"Document index rebuilt: {reconcile_catalog()} documents found.")
+
+# Run the document watcher in the foreground, printing its metrics after each cycle
+def command_watch(interval=str(WATCH_INTERVAL)):
+    watcher = DocumentWatcher(float(interval))
+    thread = threading.Thread(target=watcher.run, daemon=True)
+    thread.start()
+    cycles = -1
+    try:
+        while thread.is_alive():
+            time.sleep(1)
+            if watcher.metrics["cycles"] != cycles:
+                cycles = watcher.metrics["cycles"]
+                print(watcher.metrics, flush=True)
+    except KeyboardInterrupt:
+        watcher.stop_event.set()
+
+def command_index_text():
+    print(f"Text extracted from {update_text_index()} documents.")
+
+def command_migrate_storage():
+    num_clients, num_interventions = migrate_json_to_sqlite()
+    print(f"Copied {num_clients} clients and {num_interventions} interventions to {STORAGE_DB}.")
+
+# Writer process of the storage stress test
+def stress_storage_writer(path, worker, writes):
+    global base_path
+    base_path = path
+    storage = SqliteStorage()
+    for i in range(writes):
+        storage.add_intervention({
+            "Client": f"Client {worker}", "Payee": "Morocco",
+            "Start Date": "2024-01-01", "End Date": "2024-01-01",
+            "Number of Intervention Days": 1, "Technician": f"Technician {worker}", "Status": "Plan"
+        })
+        storage.upsert_client(f"Client {worker}-{i}", {
+            "payee": "Morocco", "address": "", "contact": "", "email": "", "sector": "Agro",
+            "num_boilers": 1, "boiler_serial_numbers": [f"SN-{worker}-{i}"], "burner_type": "Weishaupt"
+        })
+
+# Run several writer processes against a scratch SQLite database and check no write was lost
+def command_stress_storage(workers="4", writes="200"):
+    import multiprocessing
+    workers, writes = int(workers), int(writes)
+    with tempfile.TemporaryDirectory() as path:
+        processes = [multiprocessing.Process(target=stress_storage_writer, args=(path, worker, writes))
+                     for worker in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        with closing(sqlite3.connect(os.path.join(path, STORAGE_DB))) as conn:
+            num_interventions = conn.execute("SELECT COUNT(*) FROM interventions").fetchone()[0]
+            num_clients = conn.execute("SELECT COUNT(*) FROM clients").fetchone()[0]
+            num_boilers = conn.execute("SELECT COUNT(*) FROM boilers").fetchone()[0]
+
+    expected = workers * writes
+    print(f"interventions: {num_interventions}/{expected}, clients: {num_clients}/{expected}, boilers: {num_boilers}/{expected}")
+    if (num_interventions, num_clients, num_boilers) != (expected, expected, expected):
+        sys.exit("Lost writes detected.")
+    print("No lost writes.")
+
+def command_migrate_years(year=LEGACY_YEAR):
+    print(f"{migrate_year_layout(year)} month folders moved under {year}; document index rebuilt.")
+
+def command_prune_skeleton():
+    print(f"{prune_empty_folders()} empty folders removed.")
+
+COMMANDS = {
+    "reconcile": command_reconcile,
+    "index-text": command_index_text,
+    "watch": command_watch,
+    "migrate-storage": command_migrate_storage,
+    "stress-storage": command_stress_storage,
+    "migrate-years": command_migrate_years,
+    "prune-skeleton": command_prune_skeleton,
+}
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](*sys.argv[2:])
+    else:
+        main()
 
@@ -0,0 +1,406 @@
+# Benchmarks of the GMAO app: synthetic data sets, micro-benchmarks of the
+# storage, scan, scheduling, import, chart and client-list layers, and a
+# headless suite over the screens with a JSON baseline.
+# Usage: python gmao_bench.py <command> [args]
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import date, timedelta
+from contextlib import closing, contextmanager
+import pandas as pd
+import GMAO260120250 as gmao
+
+# Point the app at another base path, with its catalog kept there, for the
+# duration of a block
+@contextmanager
+def app_base_path(path):
+    saved_paths = gmao.base_path, gmao.CATALOG_PATH
+    gmao.base_path = gmao.CATALOG_PATH = path
+    try:
+        yield
+    finally:
+        gmao.base_path, gmao.CATALOG_PATH = saved_paths
+
+# Build a synthetic folder tree: num_clients clients spread over the payees,
+# each with docs_per_client empty documents across months and doc types of year
+def make_synthetic_tree(path, num_clients, docs_per_client, year=gmao.LEGACY_YEAR):
+    for i in range(num_clients):
+        classification = gmao.CLASSIFICATIONS[i % len(gmao.CLASSIFICATIONS)]
+        payee = gmao.payees_afrique[i % len(gmao.payees_afrique)]
+        for j in range(docs_per_client):
+            folder = os.path.join(path, classification, payee, f"Client {i}", year,
+                                  gmao.MONTHS[j % len(gmao.MONTHS)], gmao.DOC_TYPES[j % len(gmao.DOC_TYPES)])
+            os.makedirs(folder, exist_ok=True)
+            open(os.path.join(folder, f"document-{j}.pdf"), 'w').close()
+
+# Clients matching the folders of make_synthetic_tree, with boilers_per_client boilers each
+def make_synthetic_clients(num_clients, boilers_per_client=2):
+    return {
+        f"Client {i}": {
+            "payee": gmao.payees_afrique[i % len(gmao.payees_afrique)], "address": f"{i} Industrial Road",
+            "contact": f"Contact {i}", "email": f"client{i}@example.com", "sector": gmao.SECTORS[i % len(gmao.SECTORS)],
+            "num_boilers": boilers_per_client,
+            "boiler_serial_numbers": [f"SN-{i}-{j}" for j in range(boilers_per_client)],
+            "burner_type": gmao.BURNER_TYPES[i // len(gmao.payees_afrique) % len(gmao.BURNER_TYPES)], "classification": gmao.CLASSIFICATIONS[i % len(gmao.CLASSIFICATIONS)]
+        }
+        for i in range(num_clients)
+    }
+
+# Random (seeded) intervention history of the synthetic clients, starting from first_day
+def make_synthetic_interventions(num_interventions, num_clients, technicians, first_day=date(2020, 1, 1)):
+    random.seed(0)
+    interventions = []
+    for i in range(num_interventions):
+        start = first_day + timedelta(days=random.randrange(2000))
+        end = start + timedelta(days=random.randrange(5))
+        interventions.append({
+            "Client": f"Client {i % num_clients}", "Payee": gmao.payees_afrique[i % num_clients % len(gmao.payees_afrique)],
+            "Start Date": str(start), "End Date": str(end), "Number of Intervention Days": (end - start).days + 1,
+            "Technician": technicians[i % len(technicians)], "Status": gmao.INTERVENTION_STATUSES[i % len(gmao.INTERVENTION_STATUSES)],
+            "Type": "Preventive Maintenance"
+        })
+    return interventions
+
+# Time a full scan of a synthetic tree for several pool sizes. latency_ms adds
+# a delay to every directory listing to mimic a network-synced drive.
+def command_bench_scan(num_clients="2000", docs_per_client="5", latency_ms="2"):
+    num_clients, docs_per_client, latency = int(num_clients), int(docs_per_client), float(latency_ms) / 1000
+    real_scandir = os.scandir
+
+    def slow_scandir(path):
+        time.sleep(latency)
+        return real_scandir(path)
+
+    with tempfile.TemporaryDirectory() as path, app_base_path(path):
+        make_synthetic_tree(path, num_clients, docs_per_client)
+        os.scandir = slow_scandir
+        try:
+            for workers in (1, 2, 4, 8, 16, 32):
+                start = time.perf_counter()
+                found = sum(len(batch) for batch in gmao.scan_documents(max_workers=workers))
+                elapsed = time.perf_counter() - start
+                print(f"{workers:2d} workers: {elapsed:.2f} s for {found} documents in {num_clients} clients")
+        finally:
+            os.scandir = real_scandir
+
+# Compare client creation latency with eager and lazy folder creation
+def command_bench_create_structure(num_clients="50"):
+    num_clients = int(num_clients)
+    for lazy in (False, True):
+        with tempfile.TemporaryDirectory() as path:
+            start = time.perf_counter()
+            for i in range(num_clients):
+                gmao.create_structure(path, gmao.payees_afrique[i % len(gmao.payees_afrique)], f"Client {i}", 2024, "Others", lazy=lazy)
+            elapsed = time.perf_counter() - start
+            num_dirs = sum(len(dirs) for _, dirs, _ in os.walk(path))
+        print(f"{'lazy' if lazy else 'eager'}: {elapsed / num_clients * 1000:.2f} ms per client, "
+              f"{num_dirs} folders for {num_clients} clients")
+
+# Time conflict checks, auto-assignment and bulk planning on a random history
+def command_bench_schedule(num_interventions="10000", num_clients="500"):
+    num_interventions, num_clients = int(num_interventions), int(num_clients)
+    first_day = date(2020, 1, 1)
+    technicians = [f"Technician {i}" for i in range(20)]
+    interventions = make_synthetic_interventions(num_interventions, num_clients, technicians, first_day)
+
+    start = time.perf_counter()
+    engine = gmao.SchedulingEngine(interventions, technicians)
+    print(f"build: {(time.perf_counter() - start) * 1000:.1f} ms for {num_interventions} interventions")
+
+    probes = [(technicians[i % 20], first_day + timedelta(days=random.randrange(2000))) for i in range(10000)]
+    start = time.perf_counter()
+    for technician, day in probes:
+        engine.schedules[technician].is_free(day, day + timedelta(days=2))
+    indexed = time.perf_counter() - start
+    start = time.perf_counter()
+    for technician, day in probes[:1000]:
+        first, last = str(day), str(day + timedelta(days=2))
+        any(i["Technician"] == technician and i["Start Date"] <= last and i["End Date"] >= first for i in interventions)
+    linear = (time.perf_counter() - start) * 10
+    print(f"conflict check: {indexed / len(probes) * 1e6:.1f} us indexed, {linear / len(probes) * 1e6:.1f} us linear scan")
+
+    start = time.perf_counter()
+    for _, day in probes[:1000]:
+        engine.auto_assign(day, day + timedelta(days=2))
+    print(f"auto-assign: {(time.perf_counter() - start):.3f} ms per request")
+
+    requests = [(f"Client {i}", "Morocco", 1 + i % 3) for i in range(num_clients)]
+    start = time.perf_counter()
+    planned, unplanned = engine.plan_batch(requests, date(2026, 1, 1), date(2026, 12, 31))
+    print(f"bulk plan: {len(planned)} visits planned, {len(unplanned)} unplanned in {time.perf_counter() - start:.2f} s")
+
+# Measure import throughput (validation, folder creation and the single save)
+# on a generated file, against a scratch base path
+def command_bench_import(num_rows="50000", boilers_per_client="3"):
+    num_rows, boilers_per_client = int(num_rows), int(boilers_per_client)
+    with tempfile.TemporaryDirectory() as path, app_base_path(path):
+        rows = []
+        for i in range(num_rows):
+            client = i // boilers_per_client
+            rows.append([f"Client {client}", gmao.payees_afrique[client % len(gmao.payees_afrique)],
+                         gmao.CLASSIFICATIONS[client % len(gmao.CLASSIFICATIONS)], "Address", "Contact", "mail@example.com",
+                         gmao.SECTORS[client % len(gmao.SECTORS)], gmao.BURNER_TYPES[client % len(gmao.BURNER_TYPES)], f"SN-{i}"])
+        file_name = os.path.join(path, "import.csv")
+        pd.DataFrame(rows, columns=gmao.IMPORT_COLUMNS).to_csv(file_name, index=False)
+
+        start = time.perf_counter()
+        new_clients, rejected = gmao.import_clients(file_name, file_name)
+        validated = time.perf_counter()
+        gmao.commit_import(new_clients)
+        done = time.perf_counter()
+    print(f"{num_rows} rows, {len(new_clients)} clients, {len(rejected)} rejected")
+    print(f"validation: {num_rows / (validated - start):,.0f} rows/s; "
+          f"with folders and save: {num_rows / (done - start):,.0f} rows/s ({done - start:.2f} s)")
+
+# Module import time and memory growth of the chart layer over repeated renders
+def command_bench_charts(reruns="300"):
+    reruns = int(reruns)
+    code = ("import sys, time; start = time.perf_counter(); sys.path.insert(0, sys.argv[1]); "
+            "import GMAO260120250; print(time.perf_counter() - start, 'matplotlib' in sys.modules)")
+    output = subprocess.run([sys.executable, "-c", code, os.path.dirname(os.path.abspath(gmao.__file__))],
+                            capture_output=True, text=True).stdout.split()
+    print(f"module import: {float(output[0]) * 1000:.0f} ms, matplotlib loaded at import: {output[1]}")
+
+    months = tuple(gmao.MONTHS)
+    gmao.render_bar_chart(months, tuple(range(12)), "Warm-up", "Months", "Number of Documents")
+    tracemalloc.start()
+    for rerun in range(reruns):
+        # A handful of distinct aggregates, as from users switching filters
+        values = tuple((rerun % 5 + i) % 7 for i in range(12))
+        gmao.render_bar_chart(months, values, "Summary", "Months", "Number of Documents")
+        if rerun in (reruns // 10, reruns - 1):
+            current, peak = tracemalloc.get_traced_memory()
+            print(f"after {rerun + 1} reruns: {current / 1024:.0f} KiB traced, peak {peak / 1024:.0f} KiB")
+    tracemalloc.stop()
+
+# Memory and filter latency of the client list: per-rerun object-dtype frame
+# (previous display_clients) against the categorical gmao.FleetModel and its indexes
+def command_bench_fleet(num_boilers="50000", boilers_per_client="5"):
+    num_boilers, boilers_per_client = int(num_boilers), int(boilers_per_client)
+    clients = make_synthetic_clients(num_boilers // boilers_per_client, boilers_per_client)
+
+    def best_of(function, repeats=20):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000
+
+    def object_frame():
+        return pd.DataFrame([{
+            "Client Name": name, "Payee": info["payee"], "Address": info["address"], "Contact": info["contact"],
+            "Email": info["email"], "Sector": info["sector"], "Number of Boilers": info["num_boilers"],
+            "Burner Type": info["burner_type"], "Boiler Serial Numbers": ", ".join(info["boiler_serial_numbers"])
+        } for name, info in clients.items()])
+
+    frame = object_frame()
+    model = gmao.FleetModel(clients)
+    model_bytes = model.clients.memory_usage(deep=True).sum() + model.boilers.memory_usage(deep=True).sum()
+    print(f"{len(clients)} clients, {len(model.boilers)} boilers")
+    print(f"build: {best_of(object_frame, 3):.0f} ms object frame (every rerun), "
+          f"{best_of(lambda: gmao.FleetModel(clients), 3):.0f} ms model (once per change)")
+    print(f"memory: {frame.memory_usage(deep=True).sum() / 2**20:.1f} MiB object frame, "
+          f"{model_bytes / 2**20:.1f} MiB clients + boilers tables")
+    print(f"payee filter: {best_of(lambda: frame[frame['Payee'] == 'Senegal']):.2f} ms object scan, "
+          f"{best_of(lambda: model.clients[model.clients['payee'] == 'Senegal']):.2f} ms categorical scan, "
+          f"{best_of(lambda: model.client_positions({'payee': ['Senegal']})):.3f} ms index")
+    print(f"payee filter with display table: "
+          f"{best_of(lambda: model.client_table(model.client_positions({'payee': ['Senegal']}))):.2f} ms")
+
+    filters = {"payee": ["Senegal"], "burner_type": ["Weishaupt"]}
+    linear = best_of(lambda: pd.DataFrame(
+        [(serial, name, info["payee"], info["classification"], info["sector"], info["burner_type"])
+         for name, info in clients.items() if info["payee"] == "Senegal" and info["burner_type"] == "Weishaupt"
+         for serial in info["boiler_serial_numbers"]],
+        columns=["Boiler Serial Number", "Client Name", "Payee", "Classification", "Sector", "Burner Type"]
+    ))
+    print(f"Weishaupt boilers in Senegal ({len(model.query_boilers(filters))}): {linear:.2f} ms full pass, "
+          f"{best_of(lambda: model.query_boilers(filters)):.2f} ms indexed")
+
+# Benchmark harness: drives the screens headless through Streamlit's AppTest on a
+# synthetic base path and records latency, filesystem calls and peak memory.
+BENCH_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+BENCH_REPEATS = 5
+BENCH_TOLERANCE = 0.25  # Relative latency/memory increase reported as a regression
+
+# Write a synthetic base path: document tree, clients database and intervention history
+def make_synthetic_dataset(path, num_clients, docs_per_client, num_interventions):
+    make_synthetic_tree(path, num_clients, docs_per_client)
+    with app_base_path(path):
+        gmao.JsonStorage().save_clients(make_synthetic_clients(num_clients))
+        gmao.JsonStorage().save_interventions(make_synthetic_interventions(num_interventions, num_clients, gmao.TECHNICIANS))
+
+# Build the catalog of path, or mark it as not built so that the screens scan the folders
+def set_catalog_ready(path, ready):
+    with app_base_path(path):
+        if ready:
+            gmao.reconcile_catalog()
+        else:
+            with closing(gmao.open_catalog()) as conn, conn:
+                conn.execute("DELETE FROM catalog_meta WHERE key = 'last_reconcile'")
+
+# Widget settings of the benchmarked screens, applied once the screen is shown
+def bench_quick_search(at):
+    at.multiselect[0].set_value(gmao.payees_afrique)
+    at.multiselect[1].set_value(at.multiselect[1].options)
+    at.selectbox[0].set_value("Intervention_Report")
+    at.selectbox[1].set_value(gmao.LEGACY_YEAR)
+    at.button[0].click()
+
+def bench_offers_summary(at):
+    at.selectbox[0].set_value("Service_Offer")
+    at.selectbox[1].set_value(gmao.LEGACY_YEAR)
+    at.button[0].click()
+
+BENCH_SCREENS = [
+    # (scenario, menu entry, widget settings, catalog built)
+    ("quick_search_offers[catalog]", "Quick Offer Search", bench_quick_search, True),
+    ("quick_search_offers[scan]", "Quick Offer Search", bench_quick_search, False),
+    ("bilan_offres_bc[catalog]", "Summary of Offers and BC", bench_offers_summary, True),
+    ("bilan_offres_bc[scan]", "Summary of Offers and BC", bench_offers_summary, False),
+    ("display_clients", "Display Clients", None, True),
+    ("bilan_interventions", "Intervention Summary", None, True),
+]
+
+# One measured rerun of a screen in a fresh AppTest session; returns the
+# whole rerun's wall time and the screen's own measurement (time, filesystem
+# calls, peak traced memory when traced)
+def bench_screen_run(screen, settings, traced=False):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.abspath(gmao.__file__), default_timeout=600).run()
+    at.sidebar.selectbox[0].set_value(screen)
+    if settings:
+        at.run()
+        settings(at)
+    if traced:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        at.run()
+    finally:
+        tracemalloc.stop()
+    seconds = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"{screen}: {at.exception[0].value}")
+    return seconds, at.session_state["last_rerun"]
+
+# Median screen latency over BENCH_REPEATS reruns plus one traced rerun for
+# peak memory. latency_ms is the screen itself, rerun_ms includes the AppTest
+# round trip (script execution, sidebar, element tree).
+def bench_screen(screen, settings):
+    runs = [bench_screen_run(screen, settings) for _ in range(BENCH_REPEATS)]
+    peak = bench_screen_run(screen, settings, traced=True)[1]["peak"]
+    runs.sort(key=lambda run: run[1]["seconds"])
+    seconds, last_rerun = runs[len(runs) // 2]
+    return {"latency_ms": round(last_rerun["seconds"] * 1000, 1), "rerun_ms": round(seconds * 1000, 1),
+            "fs_calls": last_rerun["fs_calls"], "peak_kib": round(peak / 1024)}
+
+# Mean create_structure latency over num_clients new clients in a scratch folder
+def bench_create_structure(num_clients):
+    with tempfile.TemporaryDirectory() as path:
+        gmao.start_rerun_measure()
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            for i in range(num_clients):
+                gmao.create_structure(path, gmao.payees_afrique[i % len(gmao.payees_afrique)], f"Client {i}",
+                                      date.today().year, gmao.CLASSIFICATIONS[i % len(gmao.CLASSIFICATIONS)])
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            counts = gmao.stop_rerun_measure()[0]
+    return {"latency_ms": round(seconds * 1000 / num_clients, 3), "rerun_ms": None,
+            "fs_calls": {name: round(count / num_clients, 1) for name, count in counts.items()},
+            "peak_kib": round(peak / 1024)}
+
+# Print the results next to the baseline and return the regressions found
+def compare_bench(results, baseline):
+    regressions = []
+    print(f"{'scenario':30s} {'latency ms':>22s} {'peak KiB':>20s}  filesystem calls")
+    for scenario, result in results.items():
+        before = baseline.get(scenario)
+        if before is None:
+            print(f"{scenario:30s} {result['latency_ms']:>22} {result['peak_kib']:>20}  {result['fs_calls']} (new)")
+            continue
+        cells = []
+        for metric in ("latency_ms", "peak_kib"):
+            change = (result[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+            cells.append(f"{before[metric]} -> {result[metric]} ({change:+.0%})")
+            if change > BENCH_TOLERANCE:
+                regressions.append(f"{scenario}: {metric} {change:+.0%}")
+        fs_changes = {name: f"{before['fs_calls'].get(name, 0)} -> {count}" for name, count in result["fs_calls"].items()
+                      if count != before["fs_calls"].get(name, 0)}
+        if any(count > before["fs_calls"].get(name, 0) for name, count in result["fs_calls"].items()):
+            regressions.append(f"{scenario}: more filesystem calls {fs_changes}")
+        print(f"{scenario:30s} {cells[0]:>22s} {cells[1]:>20s}  {fs_changes or 'unchanged'}")
+    return regressions
+
+# Run the benchmark suite on a synthetic base path. With mode "save" (or no
+# baseline file yet) the results become the baseline; otherwise they are
+# compared with it and the command fails on regressions.
+def command_bench(mode="compare", num_clients="200", docs_per_client="10", num_interventions="5000",
+                  baseline_file=BENCH_BASELINE):
+    num_clients, docs_per_client, num_interventions = int(num_clients), int(docs_per_client), int(num_interventions)
+    parameters = {"num_clients": num_clients, "docs_per_client": docs_per_client, "num_interventions": num_interventions}
+    saved_environ = {name: os.environ.get(name) for name in ("GMAO_BASE_PATH", "GMAO_CATALOG_PATH", "GMAO_WATCH",
+                                                          "GMAO_STORAGE", "GMAO_JOBS")}
+    saved_argv = sys.argv
+    results = {}
+    with tempfile.TemporaryDirectory() as path:
+        make_synthetic_dataset(path, num_clients, docs_per_client, num_interventions)
+        os.environ.update({"GMAO_BASE_PATH": path, "GMAO_CATALOG_PATH": path, "GMAO_WATCH": "0", "GMAO_STORAGE": "json",
+                           "GMAO_JOBS": "0"})
+        sys.argv = saved_argv[:1]  # The app script must not see this command line
+        # Jobs run inline (GMAO_JOBS=0) so that scans are part of the measured rerun
+        try:
+            for scenario, screen, settings, catalog in BENCH_SCREENS:
+                set_catalog_ready(path, catalog)
+                results[scenario] = bench_screen(screen, settings)
+                print(f"{scenario}: {results[scenario]}", flush=True)
+        finally:
+            sys.argv = saved_argv
+            for name, value in saved_environ.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+    results["create_structure"] = bench_create_structure(num_clients)
+    print(f"create_structure: {results['create_structure']}")
+
+    if mode == "save" or not os.path.exists(baseline_file):
+        with open(baseline_file, 'w') as f:
+            json.dump({"parameters": parameters, "results": results}, f, indent=4)
+        print(f"Baseline saved to {baseline_file}")
+        return
+
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    if baseline["parameters"] != parameters:
+        print(f"Warning: baseline measured with {baseline['parameters']}")
+    regressions = compare_bench(results, baseline["results"])
+    if regressions:
+        print("Regressions:\n" + "\n".join(regressions))
+        sys.exit(1)
+
+COMMANDS = {
+    "bench-create-structure": command_bench_create_structure,
+    "bench-scan": command_bench_scan,
+    "bench-schedule": command_bench_schedule,
+    "bench-import": command_bench_import,
+    "bench-charts": command_bench_charts,
+    "bench-fleet": command_bench_fleet,
+    "bench": command_bench,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](*sys.argv[2:])
+    else:
+        sys.exit(f"Usage: python {os.path.basename(__file__)} <{'|'.join(COMMANDS)}> [args]")